@@ -0,0 +1,148 @@
+"""
+end-to-end throughput of crawl -> ParsePeopleCard -> PeopleCardsBuilder against local FixtureServer:
+cards/sec, p50/p95 per-card latency, WebDriver commands per card and peak RSS
+
+run from repository root: python -m benchmarks.bench_crawl [mode] [people] [latency_ms] [trace.json]
+mode is "http", "async" or "browser". Browser mode needs chromedriver at CoreDriver.Driver_path
+"""
+from benchmarks.fixture_server import FixtureServer
+from src.data_providers import UrlsProvider, XPathsProvider
+from src.parsers import IterParsePeopleCards
+from src.data_builders import PeopleCardsBuilder
+from src.metrics import Metrics
+from src.throttle import AimdThrottle
+
+from pathlib import Path
+import tempfile
+import asyncio
+import json
+import time
+import sys
+import os
+
+
+def PeakRss():
+    """
+    :return: peak resident set size of this process in bytes or None if unknown on this platform
+    """
+
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def TimeFetches(owner, metrics: Metrics):
+    """
+    time every Get_people_card of owner (HttpSession or AsyncHttpSession) as card_fetch stage
+    """
+
+    get_card = owner.Get_people_card
+    if asyncio.iscoroutinefunction(get_card):
+        async def timed(*args, **kwargs):
+            with metrics.Stage("card_fetch"):
+                return await get_card(*args, **kwargs)
+    else:
+        def timed(*args, **kwargs):
+            with metrics.Stage("card_fetch"):
+                return get_card(*args, **kwargs)
+    owner.Get_people_card = timed
+
+
+def CrawlHttp(server: FixtureServer, metrics: Metrics, throttle: AimdThrottle = None):
+    from src.http_session import HttpSession
+
+    session = HttpSession(server.Auth_cookies(), throttle=throttle)
+    TimeFetches(session, metrics)
+    return session.XPathsProvider, session.Iter_current_peoples()
+
+
+def CrawlAsync(server: FixtureServer, metrics: Metrics, throttle: AimdThrottle = None, concurrency: int = 8):
+    from src.http_session import AsyncHttpSession
+    from src.async_crawler import AsyncCrawler, IterAsync
+
+    async def crawl():
+        async with AsyncHttpSession(server.Auth_cookies(), pool_size=concurrency) as session:
+            TimeFetches(session, metrics)
+            crawler = AsyncCrawler(session, concurrency=concurrency, rate=10 ** 6, burst=concurrency,
+                                   throttle=throttle)
+            async for card in crawler.Iter_current_peoples():
+                yield card
+
+    return XPathsProvider(), IterAsync(crawl())
+
+
+def CrawlBrowser(server: FixtureServer, metrics: Metrics, throttle: AimdThrottle = None):
+    from src.core_driver import CoreDriver, CardExtraction
+    from src.browser_profile import BrowserProfile
+
+    os.environ.setdefault("GOSUSLUGI_LOGIN", "fixture")
+    os.environ.setdefault("GOSUSLUGI_PASSWORD", "fixture")
+    driver = CoreDriver(metrics=metrics, profile=BrowserProfile.Lean(), throttle=throttle)
+    driver.Login()
+    metrics.Count("login_commands", metrics.Commands_count())
+    return driver.XPathsProvider, driver.Iter_current_peoples(extraction=CardExtraction.Snapshot)
+
+
+CRAWLS = {"http": CrawlHttp, "async": CrawlAsync, "browser": CrawlBrowser}
+
+
+def Run(mode: str = "http", people: int = 200, latency: float = 0.02, trace_path: Path = None,
+        max_rate: float = None, throttle: AimdThrottle = None) -> dict:
+    """
+    crawl, parse and export all people of fixture school
+    :param mode: "http", "async" or "browser"
+    :param people: int - school size
+    :param latency: float - server latency of every page in seconds
+    :param trace_path: Path - write Chrome trace timeline of run
+    :param max_rate: float - pages per second tolerated by server, over it server answers 429
+    :param throttle: AimdThrottle - adaptive pace of crawl
+    :return: summary of run
+    """
+
+    metrics = Metrics()
+    with FixtureServer(people=people, latency=latency, max_rate=max_rate) as server, tempfile.TemporaryDirectory() as tmp:
+        urls_path = Path(tmp) / "Urls.json"
+        urls_path.write_text(json.dumps(server.Urls()), encoding="utf-8")
+        UrlsProvider.DATA_PATH = urls_path
+
+        started = time.perf_counter()
+        xpaths_provider, raw_cards = CRAWLS[mode](server, metrics, throttle)
+        cards = PeopleCardsBuilder(IterParsePeopleCards(raw_cards, xpaths_provider, metrics),
+                                   metrics).Stream(out_dir=Path(tmp))
+        elapsed = time.perf_counter() - started
+
+    if trace_path is not None:
+        metrics.Write_trace(trace_path)
+    summary = metrics.Summary()
+    fetch = summary["stages"].get("card_fetch", {})
+    parse = summary["stages"].get("parse", {})
+    crawl_commands = summary["commands_count"] - summary["counters"].get("login_commands", 0)
+    peak_rss = PeakRss()
+    return {
+        "mode": mode, "people": people, "latency_ms": latency * 1000, "server_requests": server.requests_count,
+        "server_rejected": server.rejected_count, "final_rate": throttle.rate if throttle is not None else None,
+        "cards": cards,
+        "elapsed_s": round(elapsed, 3),
+        "cards_per_s": round(cards / elapsed, 2) if elapsed else 0.0,
+        "fetch_p50_ms": fetch.get("p50_ms", 0.0),
+        "fetch_p95_ms": fetch.get("p95_ms", 0.0),
+        "parse_p50_ms": parse.get("p50_ms", 0.0),
+        "parse_p95_ms": parse.get("p95_ms", 0.0),
+        "sleep_s": summary["sleep_s"],
+        "driver_commands_per_card": round(crawl_commands / cards, 2) if cards else 0.0,
+        "peak_rss_mb": round(peak_rss / 1024 ** 2, 1) if peak_rss is not None else None,
+        "stages": summary["stages"],
+        "commands": summary["commands"],
+    }
+
+
+if __name__ == "__main__":
+    _mode = sys.argv[1] if len(sys.argv) > 1 else "http"
+    _people = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    _latency = int(sys.argv[3]) / 1000 if len(sys.argv) > 3 else 0.02
+    _trace_path = Path(sys.argv[4]) if len(sys.argv) > 4 else None
+
+    print(json.dumps(Run(_mode, _people, _latency, _trace_path), indent=2))
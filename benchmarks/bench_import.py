@@ -0,0 +1,64 @@
+"""
+cold start of entry points: import time of every module in fresh interpreter and heavy dependencies it loads.
+Interpreters are started outside repository root, offline modules must not depend on current directory
+
+run from repository root: python -m benchmarks.bench_import [runs]
+"""
+from pathlib import Path
+import subprocess
+import tempfile
+import json
+import sys
+import os
+
+
+ROOT = Path(__file__).absolute().parent.parent
+
+MODULES = ["src.cards", "src.data_providers", "src.parsers", "src.data_builders", "src.bulk_parser",
+           "src.html_cache", "src.http_session", "src.async_crawler", "src.core_driver", "main"]
+
+HEAVY = ["selenium", "fp", "lxml", "aiohttp", "requests", "pyarrow"]
+
+PROBE = """
+import sys, time, json
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+if "{module}" != "src.core_driver":
+    from src.data_providers import UrlsProvider, XPathsProvider
+    UrlsProvider(), XPathsProvider()
+print(json.dumps({{"ms": elapsed * 1000, "heavy": [name for name in {heavy} if name in sys.modules]}}))
+"""
+
+
+def Probe(module: str, cwd: str) -> dict:
+    """
+    import module in fresh interpreter started in cwd
+    :return: {"ms": import time, "heavy": loaded heavy dependencies} or {"error": ...}
+    """
+
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    result = subprocess.run([sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY)], cwd=cwd, env=env,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        return {"error": result.stderr.strip().splitlines()[-1]}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def Run(runs: int = 5) -> dict:
+    report = {}
+    with tempfile.TemporaryDirectory() as cwd:
+        for module in MODULES:
+            probes = [Probe(module, cwd) for _ in range(runs)]
+            errors = [probe["error"] for probe in probes if "error" in probe]
+            if errors:
+                report[module] = {"error": errors[0]}
+                continue
+            times = sorted(probe["ms"] for probe in probes)
+            report[module] = {"median_ms": round(times[len(times) // 2], 1), "heavy": probes[0]["heavy"]}
+
+    return report
+
+
+if __name__ == "__main__":
+    print(json.dumps(Run(int(sys.argv[1]) if len(sys.argv) > 1 else 5), indent=2))
@@ -0,0 +1,98 @@
+"""
+per-card memory footprint of parsed people cards: PeopleCard against CompactPeopleCard
+
+run from repository root: python -m benchmarks.bench_memory [cards]
+"""
+from src.parsers import BuildPeopleCard
+from src.compact_models import Compact, Interner
+
+import random
+import sys
+import tracemalloc
+
+
+CITIES = ["г. Астрахань", "с. Началово", "п. Володарский", "г. Нариманов", "с. Икряное"]
+AUTHORITIES = ["Отдел ЗАГС Кировского района г.Астрахани", "Отдел ЗАГС Советского района г.Астрахани",
+               "УМВД России по Астраханской области"]
+
+
+def __text(value: str) -> str:
+    # parsed values are distinct objects even when equal, like strings read from html
+    return "".join(list(value))
+
+
+def GenerateValues(person_id: int, rnd: random.Random) -> dict:
+    """
+    values tree of synthetic people card, same shape as PeopleCardValues.values
+    """
+
+    city = rnd.choice(CITIES)
+    return {
+        "personal_data_xpaths": {
+            "last_name": __text(rnd.choice(["Иванов", "Петров", "Сидоров", "Кузнецов"])),
+            "first_name": __text(rnd.choice(["Иван", "Пётр", "Алексей", "Мария"])),
+            "middle_name": __text(rnd.choice(["Иванович", "Петрович", "Алексеевна"])),
+            "sexM": rnd.random() < 0.5,
+            "birth_date": f"{rnd.randint(1, 28):02d}.{rnd.randint(1, 12):02d}.{rnd.randint(2005, 2017)}",
+            "birth_place": __text(city),
+            "notes": "",
+        },
+        "document_xpaths": {
+            "snils": f"{rnd.randint(100, 999)}-{rnd.randint(100, 999)}-{rnd.randint(100, 999)} {rnd.randint(10, 99)}",
+            "visa": "",
+            "birth_certificate_xpaths": {
+                "series": __text("I-КВ"), "number": str(rnd.randint(100000, 999999)),
+                "issued_by": __text(rnd.choice(AUTHORITIES)), "issued_date": "31.07.2014",
+                "issued_place": __text(city), "act_number": str(rnd.randint(1, 5000)),
+            },
+            "passport_xpaths": {"series": "", "number": "", "issued_by": "", "issued_date": "", "issued_place": ""},
+        },
+        "contact_data_xpaths": {
+            "permanent_address": __text(city + ", ул. Ленина, д. 1"), "temporary_address": "",
+            "temporary_address_end_date": "", "fact_address": __text(city + ", ул. Ленина, д. 1"), "email": "",
+            "work_phone": "", "mobile_phone": f"+7 9{rnd.randint(10 ** 8, 10 ** 9 - 1)}", "home_phone": "",
+        },
+        "worker_data_xpaths": {"work_start_date": "", "work_end_date": "", "teacher_start_date": ""},
+    }
+
+
+def Measure(build, count: int) -> int:
+    """
+    :return: bytes allocated and still alive after build(count)
+    """
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    cards = build(count)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del cards
+    return size
+
+
+def Run(count: int = 20000):
+    # values trees are generated inside the measured build and dropped after parsing,
+    # so only memory kept alive by the cards themselves is counted
+    def plain(n):
+        rnd = random.Random(0)
+        return [BuildPeopleCard(person_id, GenerateValues(person_id, rnd)) for person_id in range(n)]
+
+    def compact(n):
+        rnd = random.Random(0)
+        interner = Interner()
+        return [Compact(BuildPeopleCard(person_id, GenerateValues(person_id, rnd)), interner)
+                for person_id in range(n)], interner
+
+    plain_size = Measure(plain, count)
+    compact_size = Measure(compact, count)
+
+    print(f"[i]cards: {count}")
+    print(f"----PeopleCard: {plain_size / count:.0f} bytes/card")
+    print(f"----CompactPeopleCard: {compact_size / count:.0f} bytes/card")
+    print(f"----saved: {100 * (1 - compact_size / plain_size):.1f}%")
+
+
+if __name__ == "__main__":
+    Run(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
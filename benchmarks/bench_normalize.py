@@ -0,0 +1,55 @@
+"""
+throughput of CardsNormalizer on synthetic people cards: cards/sec of batch stage against per-card loop
+of the same normalizers
+
+run from repository root: python -m benchmarks.bench_normalize [cards] [batch_size]
+"""
+from benchmarks.bench_memory import GenerateValues
+from src.parsers import BuildPeopleCard
+from src.normalize import CardsNormalizer, FIELDS
+
+import random
+import time
+import sys
+
+
+def GenerateCards(count: int) -> list:
+    rnd = random.Random(0)
+    return [BuildPeopleCard(person_id, GenerateValues(person_id, rnd)) for person_id in range(count)]
+
+
+def NormalizeRows(cards: list):
+    """
+    baseline: every field of every card is normalized on its own
+    """
+
+    for card in cards:
+        for path, section, attribute, normalize in FIELDS:
+            item = section(card)
+            setattr(item, attribute, normalize(getattr(item, attribute))[0])
+
+
+def Run(count: int = 100000, batch_size: int = 5000) -> dict:
+    cards = GenerateCards(count)
+    started = time.perf_counter()
+    NormalizeRows(cards)
+    rows_elapsed = time.perf_counter() - started
+
+    cards = GenerateCards(count)
+    normalizer = CardsNormalizer(batch_size=batch_size)
+    started = time.perf_counter()
+    normalized = sum(1 for _ in normalizer.Iter_normalize(cards))
+    batch_elapsed = time.perf_counter() - started
+
+    return {
+        "cards": normalized, "batch_size": batch_size,
+        "rows_s": round(rows_elapsed, 3), "rows_cards_per_s": round(count / rows_elapsed),
+        "batch_s": round(batch_elapsed, 3), "batch_cards_per_s": round(count / batch_elapsed),
+        "invalid": normalizer.Invalid_counts,
+    }
+
+
+if __name__ == "__main__":
+    _count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    _batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    print(Run(_count, _batch_size))
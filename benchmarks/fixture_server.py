@@ -0,0 +1,267 @@
+"""
+local stand-in of dnevnik.ru and esia.gosuslugi.ru: login pages, paginated 'current peoples' list
+and people card pages with the structure expected by src/data/XPaths.json
+
+run from repository root: python -m benchmarks.fixture_server [port] [people] [latency_ms]
+"""
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from threading import Thread, Lock
+from html import escape
+import random
+import json
+import time
+import sys
+
+
+SCHOOL_ID = 21360
+FIRST_PERSON_ID = 1000019478000
+AUTH_COOKIE = "DnevnikAuth_a"
+AUTH_TOKEN = "fixture-token"
+
+LAST_NAMES = ["Иванов", "Петров", "Сидоров", "Кузнецов", "Смирнов", "Попов"]
+FIRST_NAMES = ["Иван", "Пётр", "Алексей", "Дмитрий", "Сергей", "Андрей"]
+MIDDLE_NAMES = ["Иванович", "Петрович", "Алексеевич", "Дмитриевич"]
+CITIES = ["г. Астрахань", "с. Началово", "п. Володарский", "г. Нариманов"]
+
+
+def __input(id: str, value: str) -> str:
+    return f'<input type="text" id="{id}" value="{escape(value)}">'
+
+
+def __date(rnd: random.Random, years: range) -> str:
+    return f"{rnd.randint(1, 28):02d}.{rnd.randint(1, 12):02d}.{rnd.choice(years)}"
+
+
+def PersonCardHtml(person_id: int) -> str:
+    """
+    people card page, deterministic for person_id
+    """
+
+    rnd = random.Random(person_id)
+    male = rnd.random() < 0.5
+    city = rnd.choice(CITIES)
+    personal = "".join([
+        __input("nlast", rnd.choice(LAST_NAMES)), __input("nfirst", rnd.choice(FIRST_NAMES)),
+        __input("nmiddle", rnd.choice(MIDDLE_NAMES)),
+        f'<input type="radio" name="sex" id="sexM" value="M"{" checked" if male else ""}>',
+        f'<input type="radio" name="sex" id="sexF" value="F"{"" if male else " checked"}>',
+        __input("birthday", __date(rnd, range(2005, 2017))), __input("birthplace", city),
+        '<select id="citizenshipType"><option value="1" selected>Гражданин Российской Федерации</option></select>',
+        '<textarea id="description"></textarea>',
+    ])
+    document = "".join([
+        __input("personalNumber", f"{rnd.randint(100, 999)}-{rnd.randint(100, 999)}-{rnd.randint(100, 999)} "
+                                  f"{rnd.randint(10, 99)}"),
+        __input("visa", ""),
+        __input("bcert_docpref", "I-КВ"), __input("bcert_docnum", str(rnd.randint(100000, 999999))),
+        __input("bcert_issby", f"Отдел ЗАГС {city}"), __input("birthcertificatedate", __date(rnd, range(2005, 2017))),
+        __input("bcert_place", city), __input("bcert_recnum", str(rnd.randint(1, 5000))),
+        __input("idoc_docpref", str(rnd.randint(1000, 9999))), __input("idoc_docnum", str(rnd.randint(10 ** 5, 10 ** 6 - 1))),
+        __input("idoc_issby", "УМВД России по Астраханской области"),
+        __input("legaldocissueddate", __date(rnd, range(2019, 2023))), __input("place", city),
+        __input("entryondutydate", ""), __input("retirementdate", ""), __input("workaspedagogstartdate", ""),
+    ])
+    contact = "".join([
+        __input("RegAddress", f"{city}, ул. Ленина, д. {rnd.randint(1, 99)}"), __input("TempAddress", ""),
+        __input("tempaddrduedate", ""), __input("ActualAddress", f"{city}, ул. Ленина, д. {rnd.randint(1, 99)}"),
+        __input("email", ""), __input("wphone", ""), __input("mobliephone", f"+79{rnd.randint(10 ** 8, 10 ** 9 - 1)}"),
+        __input("hphone", ""),
+    ])
+
+    return ("<!DOCTYPE html><html><head><title>Person</title></head><body>"
+            "<div class=\"header\"></div>"
+            "<div><div><form method=\"post\"><div>"
+            f"<div>{personal}</div><div>{document}</div><div>{contact}</div>"
+            "</div></form></div></div></body></html>")
+
+
+def CurrentPeoplesHtml(page: int, people: int, page_size: int, base: str, school: int = SCHOOL_ID) -> str:
+    """
+    'current peoples' list page: table of people links and pager with count of pages in 6th item.
+    Every school has its own people
+    """
+
+    pages = max(1, (people + page_size - 1) // page_size)
+    first = (page - 1) * page_size
+    rows = ["<tr><th>ФИО</th><th></th></tr>"]
+    for index in range(first, min(first + page_size, people)):
+        person_id = FIRST_PERSON_ID + (school - SCHOOL_ID) * 100000 + index
+        rows.append(f"<tr><td>Person {person_id}</td><td><a href=\"{base}/v2/admin/persons/person.aspx?"
+                    f"person={person_id}&school={school}\">Открыть</a></td></tr>")
+
+    return ("<!DOCTYPE html><html><head><title>Persons</title></head><body>"
+            "<div class=\"header\"></div>"
+            "<div><div><div></div><div></div><div></div><div>"
+            f"<table>{''.join(rows)}</table>"
+            "<div><ul><li>1</li><li>2</li><li>3</li><li>...</li><li>&gt;</li>"
+            f"<li><a href=\"?page={pages}\">{pages}</a></li></ul></div>"
+            "</div></div></div></body></html>")
+
+
+DNEVNIK_LOGIN_HTML = (
+    "<!DOCTYPE html><html><head><title>Login</title></head><body>"
+    "<div><div><div><div><div><form><div></div><div><div></div><div></div><div><div></div><div></div><div></div>"
+    "<div></div><div><div></div><div></div><div><a href=\"{base}/esia/login/\">Госуслуги</a></div></div>"
+    "</div></div></form></div></div></div></div></div></body></html>")
+
+GOSUSLUGI_LOGIN_HTML = (
+    "<!DOCTYPE html><html><head><title>ESIA</title></head><body>"
+    "<esia-root><div><esia-login><div><div><form method=\"get\" action=\"/esia/auth\">"
+    "<div><esia-input><input type=\"text\" name=\"login\"></esia-input></div>"
+    "<div><esia-input-password><div><input type=\"password\" name=\"password\"></div></esia-input-password></div>"
+    "<div></div><div><button type=\"submit\">Войти</button></div>"
+    "</form></div></div></esia-login></div></esia-root></body></html>")
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "FixtureDnevnik/1.0"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def __send(self, status: int, body: str = "", headers: dict = None):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def __authorized(self) -> bool:
+        return f"{AUTH_COOKIE}={AUTH_TOKEN}" in self.headers.get("Cookie", "")
+
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        base = server.Base_url()
+        with server.lock:
+            server.requests_count += 1
+
+        if url.path == "/login/esia/astrakhan":
+            return self.__send(200, DNEVNIK_LOGIN_HTML.replace("{base}", base))
+        if url.path == "/esia/login/":
+            return self.__send(200, GOSUSLUGI_LOGIN_HTML)
+        if url.path == "/esia/auth":
+            return self.__send(302, headers={"Set-Cookie": f"{AUTH_COOKIE}={AUTH_TOKEN}; Path=/",
+                                             "Location": f"{base}/v2/admin/persons/default?school={SCHOOL_ID}"})
+
+        if not self.__authorized():
+            return self.__send(302, headers={"Location": f"{base}/login/esia/astrakhan"})
+
+        if not server.Admit():
+            return self.__send(429, "<html><body>too many requests</body></html>", {"Retry-After": "1"})
+        time.sleep(server.latency)
+        if url.path == "/v2/admin/persons/default":
+            page = int(query.get("page", ["1"])[0] or 1)
+            school = int(query.get("school", [SCHOOL_ID])[0])
+            return self.__send(200, CurrentPeoplesHtml(page, server.people, server.page_size, base, school))
+        if url.path == "/v2/admin/persons/person.aspx":
+            if int(query["person"][0]) in server.broken:
+                return self.__send(500, "<html><body>internal server error</body></html>")
+            return self.__send(200, PersonCardHtml(int(query["person"][0])))
+
+        self.__send(404, "<html><body>not found</body></html>")
+
+
+class FixtureServer(ThreadingHTTPServer):
+    """
+    stand-in server. Use as context manager, it serves from a background thread
+    """
+
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, people: int = 200, page_size: int = 20, latency: float = 0.05,
+                 max_rate: float = None, broken: set = None):
+        """
+        Constructor of FixtureServer
+        :param port: int - port, random free if 0
+        :param people: int - school size
+        :param page_size: int - people per 'current peoples' page
+        :param latency: float - artificial latency of every authorized page in seconds
+        :param max_rate: float - authorized pages per second over which server answers 429, unlimited if None
+        :param broken: set of person ids whose cards always answer 500
+        """
+
+        ThreadingHTTPServer.__init__(self, ("127.0.0.1", port), FixtureHandler)
+        self.people = people
+        self.page_size = page_size
+        self.latency = latency
+        self.max_rate = max_rate
+        self.broken = broken or set()
+        self.requests_count = 0
+        self.rejected_count = 0
+        self.__admitted = []
+        self.lock = Lock()
+        self.__thread = None
+
+    def Admit(self) -> bool:
+        """
+        :return: bool - request fits max_rate in sliding window of one second
+        """
+
+        if self.max_rate is None:
+            return True
+        with self.lock:
+            now = time.monotonic()
+            self.__admitted = [admitted for admitted in self.__admitted if now - admitted < 1]
+            if len(self.__admitted) >= self.max_rate:
+                self.rejected_count += 1
+                return False
+            self.__admitted.append(now)
+            return True
+
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], ConnectionError):  # clients drop keep-alive connections at exit
+            ThreadingHTTPServer.handle_error(self, request, client_address)
+
+    def Base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def Urls(self) -> dict:
+        """
+        :return: Urls.json content pointing to this server
+        """
+
+        base = self.Base_url()
+        return {
+            "dnevnik": {
+                "login": f"{base}/login/esia/astrakhan",
+                "default_school": SCHOOL_ID,
+                "current_peoples": f"{base}/v2/admin/persons/default?school={{school}}",
+                "current_peoples_iterations": f"{base}/v2/admin/persons/default?school={{school}}"
+                                              f"&group=all&search=&class=&age=0&page=",
+            },
+            "gosuslugi": {"login": f"{base}/esia/login/"},
+        }
+
+    def Auth_cookies(self) -> [dict]:
+        """
+        :return: selenium-like cookies of logged in session
+        """
+
+        return [{"name": AUTH_COOKIE, "value": AUTH_TOKEN, "domain": "127.0.0.1", "path": "/"}]
+
+    def __enter__(self):
+        self.__thread = Thread(target=self.serve_forever, daemon=True)
+        self.__thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == "__main__":
+    _port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    _people = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    _latency = int(sys.argv[3]) / 1000 if len(sys.argv) > 3 else 0.05
+    server = FixtureServer(_port, _people, latency=_latency)
+    print(f"[+]FixtureServer {server.Base_url()}: people={_people}, latency={_latency}s")
+    print(json.dumps(server.Urls(), indent=2))
+    server.serve_forever()
@@ -1,13 +1,111 @@
-from src.core_driver import CoreDriver
-from src.parsers import ParsePeopleCard
+from src.cards import CardExtraction
+from src.browser_profile import BrowserProfile
+from src.crawl_state import CrawlStateStore
+from src.html_cache import HtmlCache
+from src.parsers import IterParsePeopleCards
+from src.normalize import CardsNormalizer
 from src.data_builders import PeopleCardsBuilder
+from src.metrics import Metrics
+from src.session_store import SessionStore
+from src.throttle import AimdThrottle
+
+CRAWL_MODE = "async"  # "browser", "http", "async" or "replay" (from html cache, without browser and login)
+RESUME_CRAWL = True
+INCREMENTAL = False
+USE_HTML_CACHE = True
+OUT_FORMAT = "csv"  # "csv", "parquet" or "sqlite"
+LEAN_BROWSER = True  # headless, no images, trackers blocked, fonts/styles/media blocked after login
+REUSE_SESSION = True  # reuse cookies of previous run from ./out/session.json, full login only if expired
+SCHOOLS = []  # ids of schools crawled by worker processes to ./out/schools, one school of Urls.json if empty
+PARSE_WORKERS = 0  # replay: re-parse stored snapshots on worker processes, in this process if 0
+NORMALIZE = True  # clean names, phones, SNILS and documents, list invalid fields of every card
+DEBUG = True  # crawl first 'current peoples' page only
+COLLECT_METRICS = False  # write ./out/metrics.json and Chrome trace ./out/metrics_trace.json
 
 if __name__ == "__main__":
-    driver = CoreDriver(click_delay=1, loading_delay=4)
+    cache = HtmlCache() if USE_HTML_CACHE or CRAWL_MODE == "replay" else None
+    state = CrawlStateStore() if RESUME_CRAWL and CRAWL_MODE != "replay" else None
+    metrics = Metrics() if COLLECT_METRICS else None
+    session_store = SessionStore() if REUSE_SESSION else None
+    throttle = AimdThrottle(rate=1, max_rate=10)  # adaptive pace instead of constant parse_delay
+
+    if SCHOOLS:
+        from src.http_session import HttpSession  # crawl modules and their dependencies are loaded by mode
+        from src.school_scheduler import SchoolScheduler
+
+        session = HttpSession.From_store(session_store) if session_store is not None else None
+        if session is None:
+            from src.core_driver import CoreDriver  # selenium is loaded only when browser login is needed
+
+            driver = CoreDriver(session=session_store,
+                                profile=BrowserProfile.Lean() if LEAN_BROWSER else BrowserProfile.Full())
+            driver.Login()
+            session = HttpSession.From_driver(driver)
+            driver.Quit()
+        SchoolScheduler(SCHOOLS, session.cookies, session.user_agent, max_concurrency=8).Run()
+    else:
+        if CRAWL_MODE == "replay":
+            from src.html_cache import ReplayCrawler
+
+            crawler = ReplayCrawler(cache)
+            xpaths_provider = crawler.XPathsProvider
+            raw_data = crawler.Iter_current_peoples()
+        else:
+            from src.http_session import HttpSession
+
+            session = HttpSession.From_store(session_store, cache=cache, throttle=throttle) \
+                if session_store is not None and CRAWL_MODE != "browser" else None
+            if session is None:
+                from src.core_driver import CoreDriver
+
+                driver = CoreDriver(cache=cache, metrics=metrics, session=session_store, throttle=throttle,
+                                    profile=BrowserProfile.Lean() if LEAN_BROWSER else BrowserProfile.Full())
+                driver.Login()
+                if CRAWL_MODE != "browser":
+                    try:
+                        session = HttpSession.From_driver(driver)
+                    finally:
+                        driver.Quit()  # crawl goes over http with cookies of driver, browser isn't needed
+            xpaths_provider = session.XPathsProvider if session is not None else driver.XPathsProvider
+
+            if CRAWL_MODE == "async":
+                from src.async_crawler import CookiesCrawler
+
+                crawler = CookiesCrawler(session.cookies, session.user_agent, concurrency=8, cache=cache,
+                                         throttle=throttle)
+            elif CRAWL_MODE == "http":
+                crawler = session
+            else:
+                crawler = driver
+            if CRAWL_MODE == "browser":
+                raw_data = crawler.Iter_current_peoples(debug=DEBUG, extraction=CardExtraction.Snapshot, state=state)
+            else:
+                raw_data = crawler.Iter_current_peoples(debug=DEBUG, state=state)
+
+        if INCREMENTAL:
+            from src.incremental import IncrementalParser, FingerprintStore
 
-    driver.Login()
-    raw_data = driver.Parse_current_peoples(debug=True)
-    cards = [ParsePeopleCard(card, driver.XPathsProvider) for card in raw_data]
-    builder = PeopleCardsBuilder(cards)
-    builder.Build()
+            incremental = IncrementalParser(FingerprintStore(), xpaths_provider)
+            cards = incremental.Iter_parse(raw_data)
+        elif CRAWL_MODE == "replay" and PARSE_WORKERS:
+            from src.bulk_parser import BulkParsePeopleCards
 
+            cards = BulkParsePeopleCards(raw_data, workers=PARSE_WORKERS)
+        else:
+            cards = IterParsePeopleCards(raw_data, xpaths_provider, metrics)
+        if NORMALIZE:
+            cards = CardsNormalizer(metrics=metrics).Iter_normalize(cards)
+        builder = PeopleCardsBuilder(cards, metrics)
+        if OUT_FORMAT == "parquet":
+            builder.Build_parquet()
+        elif OUT_FORMAT == "sqlite":
+            builder.Build_sqlite()
+        else:
+            builder.Stream()
+        if INCREMENTAL:
+            debug = DEBUG and CRAWL_MODE != "replay"  # replay reads all cached pages
+            complete = not (debug or crawler.Quarantine or crawler.Failed_pages)
+            PeopleCardsBuilder.Build_delta(incremental.Finish(complete=complete))
+        if metrics is not None:
+            metrics.Write_json("./out/metrics.json")
+            metrics.Write_trace("./out/metrics_trace.json")
@@ -0,0 +1,106 @@
+from src.data_builders import CsvBuilder
+from src.parsers import Gender, Citizenship
+
+from pathlib import Path
+from datetime import date
+from enum import Enum
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+ENUM_FIELDS = {"Gender": Gender, "Citizenship": Citizenship}
+
+
+def FieldType(field: str) -> pa.DataType:
+    """
+    arrow type of out table field: int64 ID, date32 dates, dictionary encoded enums, strings for the rest
+    """
+
+    if field == "ID":
+        return pa.int64()
+    if field.endswith("Date"):
+        return pa.date32()
+    if field in ENUM_FIELDS:
+        return pa.dictionary(pa.int8(), pa.string())
+    return pa.string()
+
+
+def TableSchema(fields: list) -> pa.Schema:
+    return pa.schema([pa.field(field, FieldType(field), nullable=field != "ID") for field in fields])
+
+
+def __date_value(value: date):
+    return None if value is None or value == date.min else value
+
+
+def __enum_value(value: Enum):
+    return None if value is None else value.name
+
+
+def __string_value(value):
+    return None if value is None else str(value)
+
+
+def ColumnConverter(field: str):
+    """
+    :return: function converting row value of field to arrow value. date.min becomes null, enums become their names
+    """
+
+    if field == "ID":
+        return int
+    if field.endswith("Date"):
+        return __date_value
+    if field in ENUM_FIELDS:
+        return __enum_value
+    return __string_value
+
+
+class ParquetStreamWriter:
+    """
+    parquet file open for appending rows. Rows are written by row groups of row_group_size
+    """
+
+    def __init__(self, fields: list, out_name: str = "data", out_dir: Path = Path("./out"),
+                 time_stamp: bool = False, row_group_size: int = 10000, compression: str = "zstd"):
+        """
+        Constructor of ParquetStreamWriter
+        :param fields: names of columns, typed by FieldType
+        :param row_group_size: int - rows per row group
+        :param compression: str - parquet compression codec
+        """
+
+        self.path = CsvBuilder.Out_path(out_name, out_dir, time_stamp, extension="parquet")
+        self.row_group_size = row_group_size
+        self.rows_count = 0
+        self.Schema = TableSchema(fields)
+        self.__converters = [ColumnConverter(field) for field in fields]
+        self.__columns = [[] for _ in fields]
+        self.__writer = pq.ParquetWriter(str(self.path.absolute()), self.Schema, compression=compression)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __write_row_group(self):
+        if not self.__columns[0]:
+            return
+        batch = pa.record_batch([pa.array(column, type=self.Schema.field(i).type)
+                                 for i, column in enumerate(self.__columns)], schema=self.Schema)
+        self.__writer.write_batch(batch, row_group_size=self.row_group_size)
+        self.rows_count += batch.num_rows
+        self.__columns = [[] for _ in self.__columns]
+
+    def append(self, row: list):
+        for column, converter, value in zip(self.__columns, self.__converters, row):
+            column.append(converter(value))
+        if len(self.__columns[0]) >= self.row_group_size:
+            self.__write_row_group()
+
+    def close(self):
+        if self.__writer is not None:
+            self.__write_row_group()
+            self.__writer.close()
+            self.__writer = None
+            print(f"[+]Build new Parquet {self.path.absolute()}, rows={self.rows_count}")
@@ -0,0 +1,304 @@
+from src.cards import PeopleCardSnapshot
+from src.http_session import AsyncHttpSession, ExportDriverCookies, ExportDriverUserAgent
+from src.crawl_state import CrawlStateStore
+from src.data_providers import UrlsProvider
+from src.throttle import AimdThrottle
+
+from typing import TYPE_CHECKING
+import asyncio
+import time
+
+if TYPE_CHECKING:
+    from src.core_driver import CoreDriver
+
+
+class TokenBucket:
+    """
+    asyncio token bucket rate limiter. One bucket is shared by all fetches of crawl
+    """
+
+    def __init__(self, rate: float, capacity: float = 1):
+        """
+        Constructor of TokenBucket
+        :param rate: float - tokens per second
+        :param capacity: float - max burst of tokens
+        """
+
+        self.rate = rate
+        self.capacity = capacity
+        self.__tokens = capacity
+        self.__last = time.monotonic()
+        self.__lock = asyncio.Lock()
+
+    def __refill(self):
+        now = time.monotonic()
+        self.__tokens = min(self.capacity, self.__tokens + (now - self.__last) * self.rate)
+        self.__last = now
+
+    async def acquire(self):
+        """
+        wait until one token is available and take it
+        """
+
+        async with self.__lock:
+            self.__refill()
+            while self.__tokens < 1:
+                await asyncio.sleep((1 - self.__tokens) / self.rate)
+                self.__refill()
+            self.__tokens -= 1
+
+
+class AsyncCrawler:
+    """
+    The class crawls all 'current peoples pages' and people cards concurrently over AsyncHttpSession
+    """
+
+    def __init__(self, session: AsyncHttpSession, concurrency: int = 8, rate: float = 5, burst: float = 5,
+                 state: CrawlStateStore = None, throttle: AimdThrottle = None):
+        """
+        Constructor of AsyncCrawler
+        :param session: AsyncHttpSession with logged in cookies
+        :param concurrency: int - max requests in flight
+        :param rate: float - max requests per second, list pages and cards together
+        :param burst: float - max requests sent at once after idle
+        :param state: CrawlStateStore - resume crawl from it, stored links and cards aren't fetched again
+        :param throttle: AimdThrottle - adapts rate of limiter to latency and failures, its rate is start rate
+        """
+
+        self.Session = session
+        self.State = state
+        self.Throttle = throttle
+        self.concurrency = concurrency
+        self.Limiter = TokenBucket(throttle.rate if throttle is not None else rate, burst)
+        self.Quarantine = []
+        self.Failed_pages = []
+        self.__semaphore = None
+        self.__seen = set()
+
+    async def __fetch(self, coroutine_function, *args):
+        async with self.__semaphore:
+            await self.Limiter.acquire()
+            if self.Throttle is None:
+                return await coroutine_function(*args)
+
+            for attempt in range(self.Throttle.retries + 1):
+                if attempt > 0:
+                    await self.Limiter.acquire()
+                started = time.monotonic()
+                try:
+                    result = await coroutine_function(*args)
+                except Exception as ex:
+                    self.Throttle.Observe_error(time.monotonic() - started, ex)
+                    self.Limiter.rate = self.Throttle.rate
+                    if attempt == self.Throttle.retries or not self.Throttle.Is_overload(ex):
+                        raise
+                    print(f"[i]retry {coroutine_function.__name__}{args}: {ex}")
+                    continue
+                self.Throttle.Observe(time.monotonic() - started)
+                self.Limiter.rate = self.Throttle.rate
+                return result
+
+    async def __get_card(self, link: str, page: int):
+        """
+        :return: stored or fetched card, None if fetch failed after all retries and link is quarantined
+        """
+
+        if self.State is not None:
+            card = self.State.Get_card(UrlsProvider.PersonIdFromLink(link))
+            if card is not None:
+                return card
+
+        try:
+            card = await self.__fetch(self.Session.Get_people_card, link)
+        except Exception as ex:
+            print(f"[x]people card {link} is quarantined: {type(ex).__name__} {ex}")
+            self.Quarantine.append(link)
+            return None
+        if self.State is not None:
+            self.State.Save_card(card, page)
+        return card
+
+    async def __crawl_page(self, page: int, cards: asyncio.Queue):
+        """
+        fetch links and cards of page, every card is put to queue as soon as it's fetched.
+        Failed cards don't stop other cards, page with quarantined cards isn't marked done,
+        resumed crawl fetches them again
+        """
+
+        links = self.State.Page_links(page) if self.State is not None else None
+        if links is None:
+            try:
+                links = await self.__fetch(self.Session.Get_current_peoples_links, page)
+            except Exception as ex:
+                print(f"[x]page {page} failed: {type(ex).__name__} {ex}")
+                self.Failed_pages.append(page)
+                return
+            if self.State is not None:
+                self.State.Save_page_links(page, links)
+        links = UrlsProvider.UniquePeopleLinks(links, self.__seen)
+        print(f"[i]page {page}: former {len(links)} links start parse")
+
+        async def get_card(link: str):
+            card = await self.__get_card(link, page)
+            if card is not None:
+                await cards.put(card)
+            return card
+
+        page_cards = await asyncio.gather(*[get_card(link) for link in links])
+        if self.State is not None and None not in page_cards:
+            self.State.Mark_page_done(page)
+
+    async def Iter_current_peoples(self, debug: bool = False):
+        """
+        yield 'peoples cards' from all 'current peoples pages' as they are fetched, one per person.
+        Queue of fetched cards is bounded, crawl waits while consumer is behind
+        :return: async generator of PeopleCardSnapshots
+        """
+
+        self.__semaphore = asyncio.Semaphore(self.concurrency)
+        self.__seen = set()
+        self.Quarantine = []
+        self.Failed_pages = []
+        max_peoples = 1 if debug else await self.__fetch(self.Session.Get_max_current_peoples_pages)
+
+        cards = asyncio.Queue(maxsize=self.concurrency * 4)
+        crawl = asyncio.ensure_future(
+            asyncio.gather(*[self.__crawl_page(i, cards) for i in range(1, max_peoples + 1)]))
+        try:
+            while not (crawl.done() and cards.empty()):
+                getter = asyncio.ensure_future(cards.get())
+                await asyncio.wait({getter, crawl}, return_when=asyncio.FIRST_COMPLETED)
+                if getter.done():
+                    yield getter.result()
+                else:
+                    getter.cancel()
+            crawl.result()
+        finally:
+            if not crawl.done():
+                crawl.cancel()
+                await asyncio.gather(crawl, return_exceptions=True)
+
+        if self.Quarantine or self.Failed_pages:
+            print(f"[x]{self.__class__.__name__}: quarantined cards {len(self.Quarantine)}, "
+                  f"failed pages {sorted(self.Failed_pages)}")
+        if self.State is not None:
+            self.State.Finish_run(complete=not self.Quarantine and not self.Failed_pages)
+
+    async def Parse_current_peoples(self, debug: bool = False) -> [PeopleCardSnapshot]:
+        """
+        collect all 'peoples cards' from all 'current peoples pages'
+        :return: list of PeopleCardSnapshots ordered by person_id, one per person
+        """
+
+        cards = {card.person_id: card async for card in self.Iter_current_peoples(debug=debug)}
+        return [cards[person_id] for person_id in sorted(cards)]
+
+
+def IterAsync(async_generator):
+    """
+    consume async generator from synchronous code. Event loop runs only while the next item is awaited,
+    so pending fetches wait while consumer parses and writes
+    :return: generator of items of async_generator
+    """
+
+    loop = asyncio.new_event_loop()
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(async_generator.__anext__())
+            except StopAsyncIteration:
+                break
+    finally:
+        loop.run_until_complete(async_generator.aclose())
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+
+
+class CookiesCrawler:
+    """
+    synchronous front of AsyncCrawler over cookies of logged in session with the same interface as HttpSession:
+    cards are streamed as pages complete
+    """
+
+    def __init__(self, cookies: [dict], user_agent: str = None, concurrency: int = 8, rate: float = 5,
+                 burst: float = 5, cache=None, throttle: AimdThrottle = None, school: int = None):
+        """
+        Constructor of CookiesCrawler
+        :param cookies: selenium-like cookie dicts
+        :param user_agent: user agent of browser the cookies were issued to
+        :param cache: HtmlCache - store html of every fetched page
+        :param throttle: AimdThrottle - adaptive rate instead of constant one
+        :param school: int - id of crawled school, default school of Urls.json if None
+        """
+
+        self.cookies = cookies
+        self.user_agent = user_agent
+        self.concurrency = concurrency
+        self.rate = rate
+        self.burst = burst
+        self.Cache = cache
+        self.Throttle = throttle
+        self.school = school
+        self.Quarantine = []
+        self.Failed_pages = []
+
+    def Iter_current_peoples(self, debug: bool = False, state: CrawlStateStore = None):
+        """
+        yield 'peoples cards' from all 'current peoples pages' as they are fetched by AsyncCrawler.
+        Quarantine and Failed_pages of crawl are available when generator is exhausted
+        :param state: CrawlStateStore - resume crawl from it, stored links and cards aren't fetched again
+        :return: generator of PeopleCardSnapshots
+        """
+
+        async def crawl():
+            async with AsyncHttpSession(self.cookies, self.user_agent, pool_size=self.concurrency,
+                                        cache=self.Cache, school=self.school) as session:
+                crawler = AsyncCrawler(session, concurrency=self.concurrency, rate=self.rate, burst=self.burst,
+                                       state=state, throttle=self.Throttle)
+                try:
+                    async for card in crawler.Iter_current_peoples(debug=debug):
+                        yield card
+                finally:
+                    self.Quarantine, self.Failed_pages = crawler.Quarantine, crawler.Failed_pages
+
+        yield from IterAsync(crawl())
+
+    def Parse_current_peoples(self, debug: bool = False, state: CrawlStateStore = None) -> [PeopleCardSnapshot]:
+        """
+        :return: list of PeopleCardSnapshots ordered by person_id
+        """
+
+        cards = {card.person_id: card for card in self.Iter_current_peoples(debug=debug, state=state)}
+        return [cards[person_id] for person_id in sorted(cards)]
+
+
+def CrawlWithCookies(cookies: [dict], user_agent: str = None, concurrency: int = 8, rate: float = 5,
+                     burst: float = 5, debug: bool = False, state: CrawlStateStore = None,
+                     cache=None, throttle: AimdThrottle = None, school: int = None) -> [PeopleCardSnapshot]:
+    """
+    crawl all people cards with AsyncCrawler over cookies of logged in session.
+    Use CookiesCrawler.Iter_current_peoples to stream cards instead of collecting them
+    :param cookies: selenium-like cookie dicts
+    :param user_agent: user agent of browser the cookies were issued to
+    :param cache: HtmlCache - store html of every fetched page
+    :param throttle: AimdThrottle - adaptive rate instead of constant one
+    :param school: int - id of crawled school, default school of Urls.json if None
+    :return: list of PeopleCardSnapshots ordered by person_id
+    """
+
+    return CookiesCrawler(cookies, user_agent, concurrency=concurrency, rate=rate, burst=burst, cache=cache,
+                          throttle=throttle, school=school).Parse_current_peoples(debug=debug, state=state)
+
+
+def CrawlWithDriverSession(core_driver: "CoreDriver", concurrency: int = 8, rate: float = 5, burst: float = 5,
+                           debug: bool = False, state: CrawlStateStore = None,
+                           school: int = None) -> [PeopleCardSnapshot]:
+    """
+    hand off session of logged in CoreDriver to AsyncHttpSession and crawl all people cards with AsyncCrawler
+    :param school: int - id of crawled school, default school of Urls.json if None
+    :return: list of PeopleCardSnapshots ordered by person_id
+    """
+
+    return CrawlWithCookies(ExportDriverCookies(core_driver), ExportDriverUserAgent(core_driver),
+                            concurrency=concurrency, rate=rate, burst=burst, debug=debug, state=state,
+                            cache=core_driver.Cache, throttle=core_driver.Throttle, school=school)
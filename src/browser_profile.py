@@ -0,0 +1,85 @@
+from dataclasses import dataclass, field
+from pathlib import Path
+
+
+TRACKER_URLS = [
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*", "*mc.yandex.ru*",
+    "*an.yandex.ru*", "*top-fwz1.mail.ru*", "*top.mail.ru*", "*vk.com/rtrg*", "*facebook.net*", "*hotjar.com*",
+    "*sentry.io*", "*newrelic.com*", "*nr-data.net*",
+]
+
+ASSET_URLS = [
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.css", "*.png", "*.jpg", "*.jpeg", "*.gif", "*.svg", "*.ico", "*.webp", "*.avif",
+    "*.mp4", "*.webm", "*.mp3",
+]
+
+
+@dataclass
+class BrowserProfile:
+    """
+    options of browser launched by CoreDriver. Blocked urls are DevTools Network.setBlockedURLs patterns,
+    '*' is wildcard. login_blocked_urls are blocked from start, crawl_blocked_urls are added after Login,
+    so ESIA login renders with its own styles and only people pages are stripped.
+    allowed_urls are never blocked, they use URLPattern syntax (e.g. 'https://*.dnevnik.ru/*') and need
+    Chrome with BlockPattern support. user_data_dir keeps browser profile with its cookies between runs
+    """
+    headless: bool = False
+    disable_images: bool = False
+    page_load_strategy: str = "normal"
+    window_size: str = "1920,1080"
+    user_data_dir: str = None
+    login_blocked_urls: list = field(default_factory=list)
+    crawl_blocked_urls: list = field(default_factory=list)
+    allowed_urls: list = field(default_factory=list)
+
+    @staticmethod
+    def Full() -> "BrowserProfile":
+        """
+        headed browser which loads everything, like regular user
+        """
+
+        return BrowserProfile()
+
+    @staticmethod
+    def Lean() -> "BrowserProfile":
+        """
+        performance profile: headless, no images, trackers blocked always, fonts, styles and media after login.
+        Pages are ready at DOMContentLoaded, readiness of elements is waited explicitly anyway
+        """
+
+        return BrowserProfile(headless=True, disable_images=True, page_load_strategy="eager",
+                              login_blocked_urls=list(TRACKER_URLS),
+                              crawl_blocked_urls=list(TRACKER_URLS) + list(ASSET_URLS))
+
+    def Arguments(self) -> [str]:
+        """
+        :return: chrome command line arguments
+        """
+
+        arguments = []
+        if self.headless:
+            arguments += ["--headless=new", "--disable-gpu", f"--window-size={self.window_size}"]
+        if self.disable_images:
+            arguments.append("--blink-settings=imagesEnabled=false")
+        if self.user_data_dir is not None:
+            arguments.append(f"--user-data-dir={Path(self.user_data_dir).absolute()}")
+        return arguments
+
+    def Prefs(self) -> dict:
+        """
+        :return: chrome profile preferences
+        """
+
+        return {"profile.managed_default_content_settings.images": 2} if self.disable_images else {}
+
+    def Blocking_command(self, logged_in: bool) -> dict:
+        """
+        :return: params of DevTools Network.setBlockedURLs before or after login. Allowed urls are sent
+        as not blocked patterns, which take precedence over blocked ones
+        """
+
+        params = {"urls": list(self.crawl_blocked_urls if logged_in else self.login_blocked_urls)}
+        if self.allowed_urls:
+            params["urlPatterns"] = [{"urlPattern": pattern, "block": False} for pattern in self.allowed_urls]
+        return params
@@ -0,0 +1,58 @@
+from src.snapshot_parser import CompiledXPaths, ExtractSnapshotValues
+from src.data_providers import XPathsProvider
+from src.parsers import BuildPeopleCard, PeopleCard
+
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from itertools import islice
+import os
+
+
+# state of worker process, set by InitParseWorker
+__compiled = None
+
+
+def InitParseWorker():
+    """
+    initializer of worker process: read XPaths.json and compile people card xpaths once per process
+    """
+
+    global __compiled
+    __compiled = CompiledXPaths(XPathsProvider())
+
+
+def ParseSnapshotsChunk(chunk: [tuple]) -> [PeopleCard]:
+    """
+    work unit of worker process
+    :param chunk: list of (person_id, page_source) of stored snapshots
+    :return: list of PeopleCards in chunk order
+    """
+
+    return [BuildPeopleCard(person_id, ExtractSnapshotValues(page_source, __compiled))
+            for person_id, page_source in chunk]
+
+
+def BulkParsePeopleCards(snapshots, workers: int = None, chunk_size: int = 64, prefetch: int = 2):
+    """
+    parse stored card snapshots on pool of worker processes, cards are yielded in order of snapshots.
+    Snapshots are read lazily, only workers * prefetch chunks are in flight
+    :param snapshots: iterable of PeopleCardSnapshots, e.g. ReplayCrawler.Iter_current_peoples()
+    :param workers: int - worker processes, count of cpus if None
+    :param chunk_size: int - snapshots sent to worker at once
+    :param prefetch: int - chunks in flight per worker
+    :return: generator of PeopleCards
+    """
+
+    workers = workers if workers is not None else os.cpu_count()
+    snapshots = iter(snapshots)
+    chunks = iter(lambda: [(snapshot.person_id, snapshot.page_source)
+                           for snapshot in islice(snapshots, chunk_size)], [])
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=InitParseWorker) as pool:
+        in_flight = deque(pool.submit(ParseSnapshotsChunk, chunk) for chunk in islice(chunks, workers * prefetch))
+        while in_flight:
+            cards = in_flight.popleft().result()
+            for chunk in islice(chunks, 1):
+                in_flight.append(pool.submit(ParseSnapshotsChunk, chunk))
+            yield from cards
+
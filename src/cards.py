@@ -0,0 +1,43 @@
+from dataclasses import dataclass
+from enum import Enum
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from selenium.webdriver.remote.webelement import WebElement
+
+
+@dataclass
+class PeopleCardWebElement:
+    """
+    personal information of people with image like web elements
+    """
+    person_id: int
+    personal_data: "WebElement"
+    document: "WebElement"
+    contact_data: "WebElement"
+    worker_data: "WebElement"
+
+
+@dataclass
+class PeopleCardValues:
+    """
+    personal information of people like raw values tree. Mirrors shape of *_xpaths from XPaths.json,
+    leaf is field value, bool for checkable inputs or None if element isn't found
+    """
+    person_id: int
+    values: dict
+
+
+@dataclass
+class PeopleCardSnapshot:
+    """
+    personal information of people like html snapshot of people card page. Parsed offline, without driver
+    """
+    person_id: int
+    page_source: str
+
+
+class CardExtraction(Enum):
+    Elements = "elements"
+    Script = "script"
+    Snapshot = "snapshot"
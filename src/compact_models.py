@@ -0,0 +1,147 @@
+from src.parsers import PeopleCard, Gender, Citizenship
+
+from dataclasses import dataclass
+from datetime import date
+
+
+@dataclass(frozen=True, slots=True)
+class CompactBirthCertificate:
+    series: str
+    number: str
+    issued_by: str
+    issued_date: date
+    issued_place: str
+    act_number: str
+
+
+@dataclass(frozen=True, slots=True)
+class CompactPassport:
+    series: str
+    number: str
+    issued_by: str
+    issued_date: date
+    issued_place: str
+
+
+@dataclass(frozen=True, slots=True)
+class CompactPersonalData:
+    last_name: str
+    first_name: str
+    middle_name: str
+    gender: Gender
+    birth_date: date
+    birth_place: str
+    citizenship: Citizenship
+    notes: str
+
+
+@dataclass(frozen=True, slots=True)
+class CompactDocument:
+    snils: str
+    visa: str
+    birth_certificate: CompactBirthCertificate
+    passport: CompactPassport
+
+
+@dataclass(frozen=True, slots=True)
+class CompactContactData:
+    permanent_address: str
+    temporary_address: str
+    temporary_address_end_date: date
+    fact_address: str
+    email: str
+    work_phone: str
+    mobile_phone: str
+    home_phone: str
+
+
+@dataclass(frozen=True, slots=True)
+class CompactWorkerData:
+    work_start_date: date
+    work_end_date: date
+    teacher_start_date: date
+
+
+@dataclass(frozen=True, slots=True)
+class CompactPeopleCard:
+    """
+    immutable slotted PeopleCard. Same attribute names as PeopleCard, so builders accept both
+    """
+    Id: int
+    PersonalData: CompactPersonalData
+    Document: CompactDocument
+    ContactData: CompactContactData
+    WorkerData: CompactWorkerData
+    Missing_fields: tuple = ()
+    Invalid_fields: tuple = ()
+
+    def Is_complete(self) -> bool:
+        return not self.Missing_fields
+
+
+class Interner:
+    """
+    pool of shared strings and dates. Equal values of all cards compacted with one Interner are one object
+    """
+
+    def __init__(self):
+        self.__strings = {}
+        self.__dates = {date.min: date.min}
+
+    def __len__(self):
+        return len(self.__strings) + len(self.__dates)
+
+    def intern_string(self, value: str) -> str:
+        return self.__strings.setdefault(value, value)
+
+    def intern_date(self, value: date) -> date:
+        return self.__dates.setdefault(value, value)
+
+
+def Compact(card: PeopleCard, interner: Interner) -> CompactPeopleCard:
+    """
+    convert PeopleCard to CompactPeopleCard, repeated strings and dates are shared through interner
+    :param card: people card
+    :param interner: pool shared by all compacted cards
+    :return: compact people card
+    """
+
+    s = interner.intern_string
+    d = interner.intern_date
+
+    pd = card.PersonalData
+    doc = card.Document
+    bcert = doc.birth_certificate
+    pas = doc.passport
+    cd = card.ContactData
+    wd = card.WorkerData
+
+    return CompactPeopleCard(
+        Id=card.Id,
+        PersonalData=CompactPersonalData(s(pd.last_name), s(pd.first_name), s(pd.middle_name), pd.gender,
+                                         d(pd.birth_date), s(pd.birth_place), pd.citizenship, s(pd.notes)),
+        Document=CompactDocument(s(doc.snils), s(doc.visa),
+                                 CompactBirthCertificate(s(bcert.series), s(bcert.number), s(bcert.issued_by),
+                                                         d(bcert.issued_date), s(bcert.issued_place),
+                                                         s(bcert.act_number)),
+                                 CompactPassport(s(pas.series), s(pas.number), s(pas.issued_by),
+                                                 d(pas.issued_date), s(pas.issued_place))),
+        ContactData=CompactContactData(s(cd.permanent_address), s(cd.temporary_address),
+                                       d(cd.temporary_address_end_date), s(cd.fact_address), s(cd.email),
+                                       s(cd.work_phone), s(cd.mobile_phone), s(cd.home_phone)),
+        WorkerData=CompactWorkerData(d(wd.work_start_date), d(wd.work_end_date), d(wd.teacher_start_date)),
+        Missing_fields=tuple(s(field) for field in card.Missing_fields),
+        Invalid_fields=tuple(s(field) for field in card.Invalid_fields))
+
+
+def IterCompact(cards, interner: Interner = None):
+    """
+    compact people cards lazily
+    :param cards: iterable of PeopleCards
+    :param interner: pool shared by all compacted cards, new one if None
+    :return: generator of CompactPeopleCards
+    """
+
+    interner = interner if interner is not None else Interner()
+    for card in cards:
+        yield Compact(card, interner)
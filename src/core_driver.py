@@ -2,27 +2,61 @@ from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
 from selenium.webdriver.remote.webelement import WebElement
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import *
-
-from fp.fp import FreeProxy
+from urllib3.exceptions import HTTPError
 
 from pathlib import Path
-from dataclasses import dataclass
+from contextlib import nullcontext, contextmanager
+from threading import Timer
+import subprocess
+import signal
 import time
+import sys
+import os
 
-from src.data_providers import UrlsProvider, XPathsProvider, EnvDataProvider, WebServices
+from src.data_providers import UrlsProvider, XPathsProvider, EnvDataProvider, WebServices, CARD_SECTIONS, CARD_VALUES_SECTIONS
+from src.browser_profile import BrowserProfile
+from src.cards import PeopleCardWebElement, PeopleCardValues, PeopleCardSnapshot, CardExtraction
 
 
-@dataclass
-class PeopleCardWebElement:
+class LoginError(WebDriverException):
     """
-    personal information of people with image like web elements
+    login page isn't where it's expected. Fetch error: recycled driver which failed login is retried
     """
-    person_id: int
-    personal_data: WebElement
-    document: WebElement
-    contact_data: WebElement
-    worker_data: WebElement
+
+
+EXTRACT_VALUES_SCRIPT = """
+function read(xpath) {
+    var node = document.evaluate(xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    if (node === null) return null;
+    if (node.tagName === 'INPUT' && (node.type === 'checkbox' || node.type === 'radio')) return node.checked;
+    if (node.tagName === 'SELECT') return node.selectedIndex < 0 ? '' : node.options[node.selectedIndex].text.trim();
+    if (node.tagName === 'INPUT') return node.value;
+    return node.textContent.trim();
+}
+function walk(tree) {
+    var out = {};
+    for (var key in tree) {
+        out[key] = typeof tree[key] === 'string' ? read(tree[key]) : walk(tree[key]);
+    }
+    return out;
+}
+return walk(arguments[0]);
+"""
+
+HARVEST_LINKS_SCRIPT = """
+var links = [];
+var rows = arguments[0].querySelectorAll('tr');
+for (var i = 0; i < rows.length; i++) {
+    var cells = rows[i].querySelectorAll(':scope > td');
+    if (cells.length === 0) continue;
+    var anchor = cells[cells.length - 1].querySelector('a');
+    if (anchor !== null) links.push(anchor.href);
+}
+return links;
+"""
 
 
 class CoreDriver:
@@ -32,28 +66,69 @@ class CoreDriver:
 
     Driver_path = Path("./chrome_driver/chromedriver.exe")
 
-    def __init__(self, proxy: bool = False, click_delay: int = 0.5, loading_delay: int = 2.5):
+    Default_timeouts = {
+        "open_login": 20,
+        "redirect_gosuslugi": 30,
+        "login_gosuslugi": 30,
+        "later_btn": 3,
+        "session_check": 10,
+        "current_peoples": 20,
+        "people_card": 20,
+        "page_load": 30,
+        "fetch_deadline": 60,
+    }
+
+    # failures of one fetch: stale or missing elements, timeouts, crashed or killed chromedriver, failed login
+    Fetch_errors = (WebDriverException, HTTPError, OSError)
+
+    def __init__(self, proxy: bool = False, click_delay: float = 0, loading_delay: float = 0,
+                 timeouts: dict = None, cache=None, metrics=None, profile: BrowserProfile = None,
+                 session=None, throttle=None, retries: int = 3, backoff: float = 2):
         """
         Constructor of CoreDriver
         :param proxy: bool - use if you need random free proxy
-        :param delay: int - delay between any actions in simulation min Value 5. A value less than this can cause errors
+        :param click_delay: float - minimum time spent on every input/click step (politeness floor)
+        :param loading_delay: float - minimum time spent on every page load step (politeness floor)
+        :param timeouts: dict - per-step readiness timeouts in seconds, merged over Default_timeouts
+        :param cache: HtmlCache - store html of every opened list page and people card
+        :param metrics: Metrics - time stages, WebDriver commands and sleeps
+        :param profile: BrowserProfile - headless mode, images and blocked urls, BrowserProfile.Full() if None
+        :param session: SessionStore - reuse cookies of previous run and save them after full Login
+        :param throttle: AimdThrottle - adaptive pace of list pages and people cards, shared with other fetchers
+        :param retries: int - failed list page or people card is fetched again up to retries times
+        :param backoff: float - seconds before first retry, doubled before every next one
         """
 
-        self.__service = Service(str(self.Driver_path.absolute()))
         self.__options = webdriver.ChromeOptions()
         self.click_delay = click_delay
         self.loading_delay = loading_delay
+        self.timeouts = dict(self.Default_timeouts)
+        if timeouts is not None:
+            self.timeouts.update(timeouts)
+        self.Cache = cache
+        self.Metrics = metrics
+        self.Profile = profile if profile is not None else BrowserProfile.Full()
+        self.Session = session
+        self.Throttle = throttle
+        self.retries = retries
+        self.backoff = backoff
+        self.Quarantine = []
+        self.Failed_pages = []
+        self.Recycles = 0
+        self.__hung = False
+        self.__apply_profile()
         if proxy:
             self.__add_proxy()
         else:
             self.Proxy = None
 
-        self.Driver = webdriver.Chrome(service=self.__service, options=self.__options)
+        self.__start()
 
         print(f"[+]CoreDriver {self} init:")
         print(f"----driver_path={self.Driver_path.name}")
 
         print(f"----proxy={self.Proxy}")
+        print(f"----headless={self.Profile.headless}, images={not self.Profile.disable_images}")
 
         self.UrlsProvider = UrlsProvider()
         self.XPathsProvider = XPathsProvider()
@@ -64,10 +139,262 @@ class CoreDriver:
         :return:
         """
 
-        self.Driver.close()
-        self.Driver.quit()
+        self.Quit()
+
+    def Quit(self):
+        """
+        close selenium driver. Safe to call many times and on crashed browser
+        :return:
+        """
+
+        if getattr(self, "Driver", None) is None:
+            return
+        try:
+            self.Driver.quit()
+        except Exception as ex:
+            print(f"[x]{self}: driver quit failed: {ex}")
+        self.Driver = None
         print(f"[-]CoreDriver {self} del")
 
+    def __start(self):
+        """
+        start chromedriver and browser with options of driver
+        :return:
+        """
+
+        # own process group: watchdog kills chromedriver together with browser processes it started
+        popen_kw = {} if sys.platform == "win32" else {"start_new_session": True}
+        self.__service = Service(str(self.Driver_path.absolute()), popen_kw=popen_kw)
+        self.Driver = webdriver.Chrome(service=self.__service, options=self.__options)
+        self.Driver.set_page_load_timeout(self.timeouts["page_load"])
+        if self.Metrics is not None:
+            self.Metrics.Instrument_driver(self.Driver)
+        self.__block_urls(logged_in=False)
+
+    def Recycle(self):
+        """
+        replace crashed or unresponsive browser with new one and login again, saved session is reused if valid.
+        Driver is None if recycle failed, next recycle starts it again
+        :return:
+        """
+
+        print(f"[i]{self}: recycle driver")
+        self.Quit()
+        self.__start()
+        try:
+            self.Login()
+        except Exception:
+            self.Quit()  # browser which isn't logged in would answer checks and fail every fetch
+            raise
+        self.Recycles += 1
+        if self.Metrics is not None:
+            self.Metrics.Count("driver_recycles")
+
+    def __kill(self, step: str):
+        """
+        watchdog action: kill chromedriver with its browser processes, blocked WebDriver command fails at once
+        instead of hanging and no orphaned browser is left
+        """
+
+        print(f"[x]{self}: step '{step}' isn't done after {self.timeouts['fetch_deadline']}s, kill driver")
+        self.__hung = True
+        process = getattr(self.__service, "process", None)
+        if process is None:
+            return
+        try:
+            if sys.platform == "win32":
+                subprocess.run(["taskkill", "/F", "/T", "/PID", str(process.pid)], capture_output=True)
+            else:
+                os.killpg(process.pid, signal.SIGKILL)
+        except OSError as ex:
+            print(f"[x]{self}: kill of process group failed: {ex}")
+            process.kill()
+
+    @contextmanager
+    def __watchdog(self, step: str):
+        """
+        kill driver if step isn't done before fetch_deadline. Page load and waits have their own timeouts,
+        watchdog catches browser which doesn't answer WebDriver commands at all
+        """
+
+        timer = Timer(self.timeouts["fetch_deadline"], self.__kill, args=(step,))
+        timer.daemon = True
+        timer.start()
+        try:
+            yield
+        finally:
+            timer.cancel()
+
+    def Is_responsive(self) -> bool:
+        """
+        :return: bool - browser answers WebDriver commands
+        """
+
+        if self.__hung or self.Driver is None:
+            return False
+        try:
+            with self.__watchdog("responsive_check"):
+                self.Driver.execute_script("return 1")
+        except self.Fetch_errors:
+            return False
+
+        return not self.__hung
+
+    def __with_retries(self, step: str, fetch, *args):
+        """
+        run fetch under watchdog, failed fetch is retried with exponential backoff.
+        Crashed, unresponsive or not started driver is recycled before retry, failed recycle takes an attempt
+        :param step: name of step for logs
+        :param fetch: function(*args)
+        :return: result of fetch
+        :raise: error of last attempt if all attempts failed
+        """
+
+        for attempt in range(self.retries + 1):
+            self.__hung = False
+            try:
+                if self.Driver is None:
+                    raise WebDriverException("driver isn't started, previous recycle failed")
+                with self.__watchdog(step):
+                    return fetch(*args)
+            except self.Fetch_errors as ex:
+                if attempt == self.retries:
+                    raise
+                print(f"[x]{self}: {step} failed, attempt {attempt + 1}/{self.retries + 1}: {type(ex).__name__}")
+                if self.Metrics is not None:
+                    self.Metrics.Count("retries")
+                self.__sleep(self.backoff * 2 ** attempt)
+                if not self.Is_responsive():
+                    try:
+                        self.Recycle()
+                    except self.Fetch_errors as recycle_ex:
+                        print(f"[x]{self}: recycle failed: {type(recycle_ex).__name__}")
+
+    def __wait(self, step: str, condition):
+        """
+        wait until condition is satisfied, but no longer than the step timeout
+        :param step: key of timeouts
+        :param condition: selenium expected condition
+        :return: result of condition
+        """
+
+        try:
+            return WebDriverWait(self.Driver, self.timeouts[step]).until(condition)
+        except TimeoutException:
+            raise TimeoutException(f"[x]{self}: step '{step}' isn't ready after {self.timeouts[step]}s")
+
+    def __wait_present(self, step: str, xpath: str) -> WebElement:
+        """
+        wait until element by xpath is present in DOM
+        :return: found element
+        """
+
+        return self.__wait(step, EC.presence_of_element_located((By.XPATH, xpath)))
+
+    def __wait_clickable(self, step: str, xpath: str) -> WebElement:
+        """
+        wait until element by xpath is visible and enabled
+        :return: found element
+        """
+
+        return self.__wait(step, EC.element_to_be_clickable((By.XPATH, xpath)))
+
+    def __apply_profile(self):
+        """
+        add arguments and preferences of browser profile to chrome options
+        :return:
+        """
+
+        for argument in self.Profile.Arguments():
+            self.__options.add_argument(argument)
+        prefs = self.Profile.Prefs()
+        if prefs:
+            self.__options.add_experimental_option("prefs", prefs)
+        self.__options.page_load_strategy = self.Profile.page_load_strategy
+
+    def __block_urls(self, logged_in: bool):
+        """
+        block urls of browser profile by DevTools network interception
+        :param logged_in: bool - use blocked urls of crawl instead of login ones
+        :return:
+        """
+
+        params = self.Profile.Blocking_command(logged_in)
+        if not params["urls"] and "urlPatterns" not in params:
+            return
+        self.Driver.execute_cdp_cmd("Network.enable", {})
+        try:
+            self.Driver.execute_cdp_cmd("Network.setBlockedURLs", params)
+        except WebDriverException as ex:
+            if "urlPatterns" not in params:
+                raise
+            print(f"[x]{self}: allowed urls aren't supported by this browser, blocked without them: {ex.msg}")
+            self.Driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": params["urls"]})
+
+    def __stage(self, name: str, **args):
+        """
+        time block of code as stage of metrics, if metrics are used
+        """
+
+        return self.Metrics.Stage(name, **args) if self.Metrics is not None else nullcontext()
+
+    def __pace(self, started: float, delay: float):
+        """
+        sleep rest of delay since started. Used as minimum politeness floor between actions
+        :param started: time.monotonic() of action start
+        :param delay: minimum duration of action
+        """
+
+        self.__sleep(delay - (time.monotonic() - started))
+
+    def __sleep(self, seconds: float):
+        """
+        sleep, accounted in metrics if they are used
+        """
+
+        if seconds <= 0:
+            return
+        if self.Metrics is not None:
+            self.Metrics.Sleep(seconds)
+        else:
+            time.sleep(seconds)
+
+    @contextmanager
+    def __throttled(self):
+        """
+        wait for slot of throttle before page load and report latency or failure of load to it
+        """
+
+        if self.Throttle is None:
+            yield
+            return
+
+        self.__sleep(self.Throttle.Reserve())
+        started = time.monotonic()
+        try:
+            yield
+        except Exception as ex:
+            self.Throttle.Observe_error(time.monotonic() - started, ex)
+            raise
+        self.Throttle.Observe(time.monotonic() - started)
+
+    def __cache_page(self, url: str, page_source: str = None):
+        """
+        store html of opened page to cache, if cache is used
+        :param url: requested url of page
+        :param page_source: html of page, read from driver if None
+        """
+
+        if self.Cache is not None:
+            self.Cache.Put(url, page_source if page_source is not None else self.Driver.page_source)
+
+    def __left_url(self, url: str):
+        """
+        condition: driver current url isn't starts with url
+        """
+
+        return lambda driver: not driver.current_url.startswith(url)
+
     def __redirectToGosuslugi(self):
         """
         redirect from dnevnik to gosuslugi login page. Need Active Dnevnik login page
@@ -75,11 +402,14 @@ class CoreDriver:
         """
         url = self.UrlsProvider.get(WebServices.Dnevnik)["login"]
         if self.Driver.current_url == url:
+            started = time.monotonic()
             login_with = self.XPathsProvider.get(WebServices.Dnevnik)["login_with_gosuslugi"]
-            self.Driver.find_element(By.XPATH, login_with).click()
-            time.sleep(self.loading_delay)
+            self.__wait_clickable("open_login", login_with).click()
+            gosuslugi_url = self.UrlsProvider.get(WebServices.Gosuslugi)["login"]
+            self.__wait("redirect_gosuslugi", EC.url_to_be(gosuslugi_url))
+            self.__pace(started, self.loading_delay)
         else:
-            raise Exception(f"[x]{self}: current driver url isn't {url}")
+            raise LoginError(f"[x]{self}: current driver url isn't {url}")
 
     def __openDnevnikLogin(self):
         """
@@ -87,9 +417,12 @@ class CoreDriver:
         :return:
         """
 
+        started = time.monotonic()
         login_url = self.UrlsProvider.get(WebServices.Dnevnik)["login"]
         self.Driver.get(login_url)
-        time.sleep(self.loading_delay)
+        login_with = self.XPathsProvider.get(WebServices.Dnevnik)["login_with_gosuslugi"]
+        self.__wait_present("open_login", login_with)
+        self.__pace(started, self.loading_delay)
 
     def __loginGosuslugi(self):
         """
@@ -99,35 +432,40 @@ class CoreDriver:
 
         url = self.UrlsProvider.get(WebServices.Gosuslugi)["login"]
         if self.Driver.current_url == url:
-            login_input_xpath = self.XPathsProvider.get(WebServices.Gosuslugi)["login_input"]
-            login_input_element = self.Driver.find_element(By.XPATH, login_input_xpath)
+            gosuslugi_xpaths = self.XPathsProvider.get(WebServices.Gosuslugi)
+
+            started = time.monotonic()
+            login_input_element = self.__wait_clickable("login_gosuslugi", gosuslugi_xpaths["login_input"])
             login_input_element.clear()
             login_input_element.send_keys(EnvDataProvider.get_login())
-            time.sleep(self.click_delay)  # delay
+            self.__pace(started, self.click_delay)  # delay
 
-            password_input_xpath = self.XPathsProvider.get(WebServices.Gosuslugi)["password_input"]
-            password_input_element = self.Driver.find_element(By.XPATH, password_input_xpath)
+            started = time.monotonic()
+            password_input_element = self.__wait_clickable("login_gosuslugi", gosuslugi_xpaths["password_input"])
             password_input_element.clear()
             password_input_element.send_keys(EnvDataProvider.get_password())
-            time.sleep(self.click_delay)  # delay
+            self.__pace(started, self.click_delay)  # delay
 
-            login_btn_xpath = self.XPathsProvider.get(WebServices.Gosuslugi)["login_btn"]
-            login_btn_element = self.Driver.find_element(By.XPATH, login_btn_xpath)
-            login_btn_element.click()
-            time.sleep(self.loading_delay)  # delay
+            started = time.monotonic()
+            later_btn_xpath = gosuslugi_xpaths["later_btn"]
+            self.__wait_clickable("login_gosuslugi", gosuslugi_xpaths["login_btn"]).click()
+            self.__wait("login_gosuslugi", EC.any_of(EC.element_to_be_clickable((By.XPATH, later_btn_xpath)),
+                                                     self.__left_url(url)))
+            self.__pace(started, self.loading_delay)  # delay
 
             try:
-                later_btn_xpath = self.XPathsProvider.get(WebServices.Gosuslugi)["later_btn"]
-                later_btn_element = self.Driver.find_element(By.XPATH, later_btn_xpath)
+                started = time.monotonic()
+                later_btn_element = self.__wait_clickable("later_btn", later_btn_xpath)
                 later_btn_element.click()
-                time.sleep(self.click_delay)  # delay
-            except NoSuchElementException:
+                self.__pace(started, self.click_delay)  # delay
+            except TimeoutException:
                 pass
             finally:
+                self.__wait("login_gosuslugi", self.__left_url(url))
                 print("[i]Login to Gosuslugi success")
 
         else:
-            raise Exception(f"[x]{self}: current driver url isn't {url}")
+            raise LoginError(f"[x]{self}: current driver url isn't {url}")
 
     def __getMaxCurrentPeoplesPages(self) -> int:
         """
@@ -135,15 +473,27 @@ class CoreDriver:
         :return: pages count
         """
 
+        started = time.monotonic()
         url = self.UrlsProvider.get(WebServices.Dnevnik)["current_peoples"]
         self.Driver.get(url)
 
-        time.sleep(self.loading_delay)  # delay
         max_count_xpath = self.XPathsProvider.get(WebServices.Dnevnik)["max_current_peoples"]
-        counter_element = self.Driver.find_element(By.XPATH, max_count_xpath)
+        counter_element = self.__wait_present("current_peoples", max_count_xpath)
+        self.__cache_page(url)
+        self.__pace(started, self.loading_delay)  # delay
 
         return int(counter_element.text)
 
+    def __wait_people_card(self):
+        """
+        wait until all sections of opened people card are present
+        :return:
+        """
+
+        dnevnik_xpaths = self.XPathsProvider.get(WebServices.Dnevnik)
+        self.__wait("people_card", EC.all_of(*[EC.presence_of_element_located((By.XPATH, dnevnik_xpaths[section]))
+                                               for section in CARD_SECTIONS]))
+
     def __parse_current_people_card(self, id: int) -> PeopleCardWebElement:
         """
         parse current people card and compare PeopleCardWebElement
@@ -166,57 +516,262 @@ class CoreDriver:
 
         return people_card
 
-    def Login(self):
+    def __extract_current_people_card_values(self, id: int) -> PeopleCardValues:
+        """
+        read all fields of current people card by one execute_script call
+        :return: people card like raw values tree
+        """
+
+        dnevnik_xpaths = self.XPathsProvider.get(WebServices.Dnevnik)
+        tree = {section: dnevnik_xpaths[section] for section in CARD_VALUES_SECTIONS}
+
+        return PeopleCardValues(person_id=id, values=self.Driver.execute_script(EXTRACT_VALUES_SCRIPT, tree))
+
+    def Get_all_cookies(self) -> [dict]:
+        """
+        all cookies of browser, not only cookies of current page domain
+        :return: DevTools or selenium-like cookie dicts
         """
-        Login to Dnevnik use gosuslugi
+
+        try:
+            return self.Driver.execute_cdp_cmd("Network.getAllCookies", {})["cookies"]
+        except Exception:
+            return self.Driver.get_cookies()
+
+    def __set_cookies(self, cookies: [dict]):
+        """
+        put saved cookies to browser for all their domains at once, without opening pages
+        :param cookies: DevTools or selenium-like cookie dicts
         :return:
         """
 
-        self.__openDnevnikLogin()
-        self.__redirectToGosuslugi()
-        time.sleep(self.loading_delay)
-        self.__loginGosuslugi()
+        params = []
+        for cookie in cookies:
+            param = {key: cookie[key] for key in ("name", "value", "domain", "path", "secure", "httpOnly", "sameSite")
+                     if key in cookie}
+            expires = cookie.get("expires", cookie.get("expiry"))
+            if expires is not None and expires > 0:
+                param["expires"] = expires
+            params.append(param)
+        self.Driver.execute_cdp_cmd("Network.setCookies", {"cookies": params})
+
+    def Is_logged_in(self) -> bool:
+        """
+        cheap check of session: open 'Current Peoples' and look if it isn't redirected to login
+        :return: bool
+        """
+
+        url = self.UrlsProvider.get(WebServices.Dnevnik)["current_peoples"]
+        table_xpath = self.XPathsProvider.get(WebServices.Dnevnik)["current_peoples_table"]
+        self.Driver.get(url)
+        try:
+            self.__wait("session_check", EC.any_of(EC.presence_of_element_located((By.XPATH, table_xpath)),
+                                                   self.__left_url(url)))
+        except TimeoutException:
+            return False
+
+        return self.Driver.current_url.startswith(url) and \
+            len(self.Driver.find_elements(By.XPATH, table_xpath)) > 0
 
-    def Parse_current_peoples(self, parse_delay: int = 6, debug: bool = False) -> [PeopleCardWebElement]:
+    def __reuse_session(self) -> bool:
         """
-        collect all 'peoples cards' from all 'current peoples pages'
-        :return: list of PeopleCardWebElements
+        restore session of saved cookies or persistent browser profile and check it
+        :return: bool - session is valid, Login isn't needed
+        """
+
+        if self.Session is None and self.Profile.user_data_dir is None:
+            return False
+        if self.Session is not None:
+            cookies = self.Session.Load()
+            if cookies:
+                self.__set_cookies(cookies)
+            elif self.Profile.user_data_dir is None:
+                return False
+
+        return self.Is_logged_in()
+
+    def Login(self, force: bool = False):
+        """
+        Login to Dnevnik use gosuslugi. Saved session is reused if it's still valid
+        :param force: bool - full login even if saved session is valid
+        :return:
+        """
+
+        with self.__stage("login"):
+            if not force and self.__reuse_session():
+                print("[i]Login skipped: saved session is valid")
+            else:
+                self.__openDnevnikLogin()
+                self.__redirectToGosuslugi()
+                self.__loginGosuslugi()
+                if self.Session is not None:
+                    self.Session.Save(self.Get_all_cookies(), self.Driver.execute_script("return navigator.userAgent"))
+            self.__block_urls(logged_in=True)
+
+    def Get_max_current_peoples_pages(self) -> int:
+        """
+        :return: count of 'current peoples pages'
+        """
+
+        with self.__stage("page_discovery"):
+            return self.__with_retries("page_discovery", self.__getMaxCurrentPeoplesPages)
+
+    def Get_current_peoples_links(self, page: int) -> [str]:
+        """
+        open 'current peoples page' and collect people card links of all rows by one execute_script call
+        :param page: number of page, from 1
+        :return: people card links
         """
 
-        max_peoples = self.__getMaxCurrentPeoplesPages()
         url = self.UrlsProvider.get(WebServices.Dnevnik)["current_peoples_iterations"]
         table_xpath = self.XPathsProvider.get(WebServices.Dnevnik)["current_peoples_table"]
 
+        with self.__stage("link_extraction", page=page):
+            started = time.monotonic()
+            with self.__throttled():
+                self.Driver.get(url + str(page))
+                table_element = self.__wait_present("current_peoples", table_xpath)
+            self.__cache_page(url + str(page))
+            self.__pace(started, self.loading_delay)  # delay
+            print(f"[i]choose table: {table_element}")
+
+            return self.Driver.execute_script(HARVEST_LINKS_SCRIPT, table_element)
+
+    def Get_people_card(self, link: str, parse_delay: float = 0,
+                        extraction: CardExtraction = CardExtraction.Elements):
+        """
+        open people card and collect it
+        :param link: people card link
+        :param parse_delay: float - minimum time spent on people card (politeness floor)
+        :param extraction: CardExtraction
+        :return: PeopleCardWebElement, PeopleCardValues or PeopleCardSnapshot
+        """
+
+        with self.__stage("card_fetch", link=link):
+            print(f"[i]open people card: {link}")
+            started = time.monotonic()
+            with self.__throttled():
+                self.Driver.get(link)
+                self.__wait_people_card()
+            self.__pace(started, self.loading_delay)  # delay
+            id = UrlsProvider.PersonIdFromLink(link)
+            page_source = self.Driver.page_source if extraction is CardExtraction.Snapshot or self.Cache else None
+            self.__cache_page(link, page_source)
+            if extraction is CardExtraction.Script:
+                card = self.__extract_current_people_card_values(id)
+            elif extraction is CardExtraction.Snapshot:
+                card = PeopleCardSnapshot(person_id=id, page_source=page_source)
+            else:
+                card = self.__parse_current_people_card(id)
+            self.__pace(started, self.loading_delay + parse_delay)
+
+            return card
+
+    def __fetch_card(self, link: str, parse_delay: float, extraction: CardExtraction):
+        """
+        Get_people_card with retries, card failed all attempts is put to quarantine
+        :return: card or None if card is quarantined
+        """
+
+        try:
+            card = self.__with_retries("card_fetch", self.Get_people_card, link, parse_delay, extraction)
+        except self.Fetch_errors as ex:
+            print(f"[x]{self}: people card {link} is quarantined: {type(ex).__name__}")
+            if link not in self.Quarantine:
+                self.Quarantine.append(link)
+            return None
+
+        if link in self.Quarantine:
+            self.Quarantine.remove(link)
+        return card
+
+    def __fetch_links(self, page: int) -> [str]:
+        return self.__with_retries("link_extraction", self.Get_current_peoples_links, page)
+
+    def Parse_current_peoples_page(self, page: int, parse_delay: float = 0,
+                                   extraction: CardExtraction = CardExtraction.Elements) -> list:
+        """
+        collect all 'peoples cards' from one 'current peoples page'. Failed cards are quarantined, not returned
+        :param page: number of page, from 1
+        :return: list of cards, see Get_people_card
+        """
+
+        links = self.__fetch_links(page)
+        print(f"[i]former {len(links)} links start parse")
+
+        cards = [self.__fetch_card(link, parse_delay, extraction) for link in links]
+        return [card for card in cards if card is not None]
+
+    def Iter_current_peoples(self, parse_delay: float = 0, debug: bool = False,
+                             extraction: CardExtraction = CardExtraction.Elements, state=None):
+        """
+        yield 'peoples cards' from all 'current peoples pages' one by one, as soon as every card is collected.
+        People seen on previous pages are skipped. Every page and card is retried, crashed browser is recycled;
+        cards failed all attempts go to Quarantine, pages to Failed_pages, crawl goes on. Both are reset by every crawl
+        :param parse_delay: float - minimum time spent on every people card (politeness floor)
+        :param extraction: CardExtraction - Elements keeps live web elements, Script reads all values in one call,
+        Snapshot keeps html of card page
+        :param state: CrawlStateStore - resume crawl from it, stored cards are yielded without fetching.
+        Page with quarantined cards isn't marked done, resumed crawl fetches them again.
+        Run of state is finished when crawl ends complete. Elements extraction can't be stored
+        :return: generator of PeopleCardWebElements, PeopleCardValues or PeopleCardSnapshots
+        """
+
+        max_peoples = self.Get_max_current_peoples_pages()
+
         if debug:
             max_peoples = 1
 
-        peoples_cards = []
+        self.Quarantine = []
+        self.Failed_pages = []
+        seen = set()
         for i in range(1, max_peoples + 1):
-            self.Driver.get(url + str(i))
-            time.sleep(self.loading_delay)  # delay
-            table_element = self.Driver.find_element(By.XPATH, table_xpath)
-            print(f"[i]choose table: {table_element}")
-            links = []
-            for row in table_element.find_elements(By.CSS_SELECTOR, "tr"):
-                try:
-                    ceils = row.find_elements(By.CSS_SELECTOR, "td")
-                    if len(ceils) > 0:
-                        btn = ceils[-1].find_element(By.CSS_SELECTOR, "a")
-                        links.append(btn.get_attribute('href'))
-                except NoSuchElementException:
-                    pass
+            try:
+                if state is not None:
+                    yield from state.Iter_page(i, self.__fetch_links,
+                                               lambda link: self.__fetch_card(link, parse_delay, extraction), seen)
+                    continue
+
+                links = UrlsProvider.UniquePeopleLinks(self.__fetch_links(i), seen)
+            except self.Fetch_errors as ex:
+                print(f"[x]{self}: page {i} failed: {type(ex).__name__}")
+                self.Failed_pages.append(i)
+                continue
 
             print(f"[i]former {len(links)} links start parse")
-            for link in links[:1]:
-                print(f"[i]open people card: {link}")
-                self.Driver.get(link)
-                time.sleep(self.loading_delay)  # delay
-                sub = link[link.find("person="):].replace("person=", '')
-                id = int(sub[:sub.find("&")])
-                peoples_cards.append(self.__parse_current_people_card(id))
-                time.sleep(parse_delay)
+            for link in links:
+                card = self.__fetch_card(link, parse_delay, extraction)
+                if card is not None:
+                    yield card
 
-        return peoples_cards
+        if self.Quarantine or self.Failed_pages:
+            print(f"[x]{self}: quarantined cards {len(self.Quarantine)}, failed pages {self.Failed_pages}")
+        if state is not None:
+            state.Finish_run(complete=not self.Quarantine and not self.Failed_pages)
+
+    def Retry_quarantine(self, parse_delay: float = 0, extraction: CardExtraction = CardExtraction.Elements):
+        """
+        fetch quarantined people cards again, cards failed again stay in Quarantine
+        :return: generator of cards, see Get_people_card
+        """
+
+        for link in list(self.Quarantine):
+            card = self.__fetch_card(link, parse_delay, extraction)
+            if card is not None:
+                yield card
+
+    def Parse_current_peoples(self, parse_delay: float = 0, debug: bool = False,
+                              extraction: CardExtraction = CardExtraction.Elements, state=None) -> list:
+        """
+        collect all 'peoples cards' from all 'current peoples pages'
+        :param parse_delay: float - minimum time spent on every people card (politeness floor)
+        :param extraction: CardExtraction - Elements keeps live web elements, Script reads all values in one call,
+        Snapshot keeps html of card page
+        :param state: CrawlStateStore - resume crawl from it
+        :return: list of PeopleCardWebElements, PeopleCardValues or PeopleCardSnapshots
+        """
+
+        return list(self.Iter_current_peoples(parse_delay, debug, extraction, state))
 
     def __add_proxy(self):
         """
@@ -224,6 +779,8 @@ class CoreDriver:
         :return:
         """
 
+        from fp.fp import FreeProxy  # only proxied drivers pay its import
+
         self.Proxy = FreeProxy(anonym=True).get()
         self.__options.add_argument(f"--proxy-server={self.Proxy}")
 
@@ -0,0 +1,182 @@
+from src.cards import PeopleCardValues, PeopleCardSnapshot
+from src.data_providers import UrlsProvider
+
+from pathlib import Path
+import sqlite3
+import json
+
+
+class CrawlStateStore:
+    """
+    Durable crawl state in SQLite (WAL): people card links of every page, collected cards and done pages.
+    A restarted crawl skips everything already stored. Every crawl is a run: unfinished run is resumed,
+    run finished without failed pages and quarantined cards clears the state, next crawl starts from scratch
+    """
+
+    DefaultPath = Path("./out/crawl_state.sqlite3")
+
+    def __init__(self, path: Path = DefaultPath):
+        """
+        Constructor of CrawlStateStore
+        :param path: path of sqlite database, created if not exists
+        """
+
+        self.path = path
+        self.Connection = sqlite3.connect(str(Path(path).absolute()))
+        self.Connection.execute("PRAGMA journal_mode=WAL")
+        self.Connection.execute("PRAGMA synchronous=NORMAL")
+        with self.Connection:
+            self.Connection.executescript("""
+                CREATE TABLE IF NOT EXISTS pages (page INTEGER PRIMARY KEY, done INTEGER NOT NULL DEFAULT 0);
+                CREATE TABLE IF NOT EXISTS links (page INTEGER NOT NULL, position INTEGER NOT NULL,
+                                                  link TEXT NOT NULL, PRIMARY KEY (page, position));
+                CREATE TABLE IF NOT EXISTS cards (person_id INTEGER PRIMARY KEY, page INTEGER,
+                                                  kind TEXT NOT NULL, payload TEXT NOT NULL);
+                CREATE TABLE IF NOT EXISTS runs (run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                                                 started TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                                                 finished TEXT, complete INTEGER NOT NULL DEFAULT 0);
+            """)
+        self.Run_id = self.__start_run()
+
+        print(f"[+]CrawlStateStore {self.path}: run {self.Run_id}, {self.Cards_count()} cards, "
+              f"{len(self.Done_pages())} done pages")
+
+    def __start_run(self) -> int:
+        """
+        :return: id of last unfinished run to resume or of new run. State left by finished run is cleared
+        """
+
+        row = self.Connection.execute("SELECT run_id, finished FROM runs ORDER BY run_id DESC LIMIT 1").fetchone()
+        if row is not None and row[1] is None:
+            return row[0]
+        if row is not None:
+            self.Clear()
+        with self.Connection:
+            return self.Connection.execute("INSERT INTO runs DEFAULT VALUES").lastrowid
+
+    def Finish_run(self, complete: bool):
+        """
+        record end of crawl. Complete run clears the state, partial run stays unfinished and next crawl resumes it
+        :param complete: bool - no failed pages and no quarantined cards
+        """
+
+        if not complete:
+            print(f"[i]CrawlStateStore: run {self.Run_id} is partial, next crawl resumes it")
+            return
+        with self.Connection:
+            self.Connection.execute("UPDATE runs SET finished = CURRENT_TIMESTAMP, complete = 1 WHERE run_id = ?",
+                                    (self.Run_id,))
+        self.Clear()
+        print(f"[+]CrawlStateStore: run {self.Run_id} is finished, state is cleared")
+
+    def close(self):
+        self.Connection.close()
+
+    def Clear(self):
+        """
+        forget all state of current run, next crawl starts from page 1. History of runs is kept
+        """
+
+        with self.Connection:
+            self.Connection.executescript("DELETE FROM pages; DELETE FROM links; DELETE FROM cards;")
+
+    def Done_pages(self) -> [int]:
+        return [page for page, in self.Connection.execute("SELECT page FROM pages WHERE done = 1 ORDER BY page")]
+
+    def Is_page_done(self, page: int) -> bool:
+        row = self.Connection.execute("SELECT done FROM pages WHERE page = ?", (page,)).fetchone()
+        return row is not None and row[0] == 1
+
+    def Page_links(self, page: int):
+        """
+        :return: stored links of page or None if page links weren't collected yet
+        """
+
+        if self.Connection.execute("SELECT 1 FROM pages WHERE page = ?", (page,)).fetchone() is None:
+            return None
+        return [link for link, in self.Connection.execute("SELECT link FROM links WHERE page = ? ORDER BY position",
+                                                          (page,))]
+
+    def Save_page_links(self, page: int, links: [str]):
+        with self.Connection:
+            self.Connection.execute("INSERT OR REPLACE INTO pages (page, done) VALUES (?, 0)", (page,))
+            self.Connection.execute("DELETE FROM links WHERE page = ?", (page,))
+            self.Connection.executemany("INSERT INTO links (page, position, link) VALUES (?, ?, ?)",
+                                        [(page, position, link) for position, link in enumerate(links)])
+
+    def Mark_page_done(self, page: int):
+        with self.Connection:
+            self.Connection.execute("UPDATE pages SET done = 1 WHERE page = ?", (page,))
+
+    @staticmethod
+    def __dump(card) -> (str, str):
+        if isinstance(card, PeopleCardSnapshot):
+            return "snapshot", card.page_source
+        if isinstance(card, PeopleCardValues):
+            return "values", json.dumps(card.values, ensure_ascii=False)
+        raise ValueError(f"[x]CrawlStateStore: card {type(card).__name__} can't be stored")
+
+    @staticmethod
+    def __load(person_id: int, kind: str, payload: str):
+        if kind == "snapshot":
+            return PeopleCardSnapshot(person_id=person_id, page_source=payload)
+        return PeopleCardValues(person_id=person_id, values=json.loads(payload))
+
+    def Get_card(self, person_id: int):
+        """
+        :return: stored PeopleCardSnapshot or PeopleCardValues, None if card isn't collected yet
+        """
+
+        row = self.Connection.execute("SELECT kind, payload FROM cards WHERE person_id = ?", (person_id,)).fetchone()
+        return None if row is None else self.__load(person_id, *row)
+
+    def Save_card(self, card, page: int = None):
+        kind, payload = self.__dump(card)
+        with self.Connection:
+            self.Connection.execute("INSERT OR REPLACE INTO cards (person_id, page, kind, payload) VALUES (?, ?, ?, ?)",
+                                    (card.person_id, page, kind, payload))
+
+    def Cards_count(self) -> int:
+        return self.Connection.execute("SELECT COUNT(*) FROM cards").fetchone()[0]
+
+    def Iter_cards(self):
+        """
+        :return: generator of all stored cards ordered by person_id
+        """
+
+        for person_id, kind, payload in self.Connection.execute(
+                "SELECT person_id, kind, payload FROM cards ORDER BY person_id"):
+            yield self.__load(person_id, kind, payload)
+
+    def Iter_page(self, page: int, get_links, get_card, seen: set = None):
+        """
+        yield cards of page, fetch only links and cards not stored yet
+        :param page: number of page, from 1
+        :param get_links: function(page) -> links of page
+        :param get_card: function(link) -> card or None if card isn't collected (e.g. quarantined)
+        :param seen: ids of people yielded from previous pages, they are skipped
+        :return: generator of cards in page order. Page with not collected cards isn't marked done
+        """
+
+        links = self.Page_links(page)
+        if links is None:
+            links = get_links(page)
+            self.Save_page_links(page, links)
+        elif not self.Is_page_done(page):
+            print(f"[i]resume page {page}: {len(links)} links")
+        if seen is not None:
+            links = UrlsProvider.UniquePeopleLinks(links, seen)
+
+        complete = True
+        for link in links:
+            card = self.Get_card(UrlsProvider.PersonIdFromLink(link))
+            if card is None:
+                card = get_card(link)
+                if card is None:
+                    complete = False
+                    continue
+                self.Save_card(card, page)
+            yield card
+
+        if complete:
+            self.Mark_page_done(page)
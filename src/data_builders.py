@@ -1,10 +1,15 @@
 from src.parsers import PeopleCard
 from dataclasses import dataclass
 from pathlib import Path
+from contextlib import nullcontext
 import csv
 from datetime import datetime
 
 
+CSV_ENCODING = "utf-8"
+CSV_BUFFER_SIZE = 1024 * 1024
+
+
 @dataclass
 class RawCSV:
     fields: list
@@ -13,116 +18,248 @@ class RawCSV:
 
 class CsvBuilder:
     @staticmethod
-    def Build_CSV(data: RawCSV, out_name: str = "data", out_dir: Path = Path("./out"), time_stamp: bool = False):
+    def Out_path(out_name: str = "data", out_dir: Path = Path("./out"), time_stamp: bool = False,
+                 extension: str = "csv") -> Path:
         """
-        Create csv file from raw data
-        :param data:
+        path of out file
         :param out_name: file name
         :param out_dir: file directory
         :param time_stamp: use time stamp on out file or no
+        :param extension: file extension
         :return:
         """
         if time_stamp:
             current_time = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
-            path = Path(out_dir / f"{out_name}_{current_time}.csv")
+            return Path(out_dir / f"{out_name}_{current_time}.{extension}")
         else:
-            path = Path(out_dir / f"{out_name}.csv")
+            return Path(out_dir / f"{out_name}.{extension}")
 
-        with open(path.absolute(), 'w+', newline='') as file:
+    @staticmethod
+    def Build_CSV(data: RawCSV, out_name: str = "data", out_dir: Path = Path("./out"), time_stamp: bool = False):
+        """
+        Create csv file from raw data
+        :param data:
+        :param out_name: file name
+        :param out_dir: file directory
+        :param time_stamp: use time stamp on out file or no
+        :return:
+        """
+        path = CsvBuilder.Out_path(out_name, out_dir, time_stamp)
+
+        with open(path.absolute(), 'w+', newline='', encoding=CSV_ENCODING, buffering=CSV_BUFFER_SIZE) as file:
             writer = csv.writer(file)
             field = data.fields
 
             writer.writerow(field)
-            for row in data.rows:
-                writer.writerow(row)
+            writer.writerows(data.rows)
         print(f"[+]Build new CSV {path.absolute()}")
 
 
+class CsvStreamWriter:
+    """
+    csv file open for appending rows. Rows are written in batches through a large buffer
+    and flushed to disk every flush_every rows
+    """
+
+    def __init__(self, fields: list, out_name: str = "data", out_dir: Path = Path("./out"),
+                 time_stamp: bool = False, flush_every: int = 100, batch_size: int = 100,
+                 buffer_size: int = CSV_BUFFER_SIZE, encoding: str = CSV_ENCODING):
+        """
+        Constructor of CsvStreamWriter
+        :param fields: header of csv
+        :param flush_every: int - flush file to disk every flush_every rows
+        :param batch_size: int - rows passed to csv writer at once
+        :param buffer_size: int - file buffer size in bytes
+        :param encoding: str - file encoding
+        """
+        self.path = CsvBuilder.Out_path(out_name, out_dir, time_stamp)
+        self.flush_every = flush_every
+        self.batch_size = batch_size
+        self.rows_count = 0
+        self.__flushed_count = 0
+        self.__batch = []
+        self.__file = open(self.path.absolute(), 'w+', newline='', encoding=encoding, buffering=buffer_size)
+        self.__writer = csv.writer(self.__file)
+        self.__writer.writerow(fields)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __write_batch(self):
+        self.__writer.writerows(self.__batch)
+        self.rows_count += len(self.__batch)
+        self.__batch = []
+        if self.rows_count - self.__flushed_count >= self.flush_every:
+            self.__file.flush()
+            self.__flushed_count = self.rows_count
+
+    def append(self, row: list):
+        self.__batch.append(row)
+        if len(self.__batch) >= self.batch_size:
+            self.__write_batch()
+
+    def close(self):
+        if not self.__file.closed:
+            self.__write_batch()
+            self.__file.close()
+            print(f"[+]Build new CSV {self.path.absolute()}, rows={self.rows_count}")
+
+
 class PeopleCardsBuilder:
     __DefaultOutName = "dump"
     __DefaultOutDir = Path("./out")
     __UseTimeStamps = True
 
-    def __init__(self, cards: [PeopleCard]):
+    PersonalDataFields = ["ID", "Last_Name", "First_Name", "Middle_Name", "Gender", "Birth_Date", "Birth_Place",
+                          "Citizenship", "Notes", "Missing_Fields", "Invalid_Fields"]
+    DocumentDataFields = ["ID", "SNILS", "VISA", "B_Series", "B_Number", "B_IssuedBy", "B_IssuedDate",
+                          "B_IssuedPlace", "B_ActNumber", "P_Series", "P_Number", "P_IssuedBy", "P_IssuedDate",
+                          "P_IssuedPlace"]
+    ContactDataFields = ["ID", "Permanent_Address", "Temporary_Address", "Temporary_Address_End_Date",
+                         "Fact_Address", "Email", "Work_Phone", "Mobile_Phone", "Home_Phone"]
+    WorkerDataFields = ["ID", "Work_Start_Date", "Work_End_Date", "Teacher_Start_Date"]
+
+    def __init__(self, cards: [PeopleCard], metrics=None):
+        """
+        Constructor of PeopleCardsBuilder
+        :param cards: list of cards for Build, any iterable (e.g. generator) for Stream
+        :param metrics: Metrics - time export of every card
+        """
         self.__cards = cards
+        self.Metrics = metrics
+
+    # rows keep typed values (date, Gender, Citizenship); csv writer formats them with str()
+
+    @staticmethod
+    def personal_data_row(card: PeopleCard) -> list:
+        pd = card.PersonalData
+        return [card.Id, pd.last_name, pd.first_name, pd.middle_name, pd.gender, pd.birth_date,
+                pd.birth_place, pd.citizenship, pd.notes, " ".join(card.Missing_fields),
+                " ".join(card.Invalid_fields)]
+
+    @staticmethod
+    def document_data_row(card: PeopleCard) -> list:
+        doc = card.Document
+        bcert = doc.birth_certificate
+        pas = doc.passport
+        return [card.Id, doc.snils, doc.visa, bcert.series, bcert.number, bcert.issued_by, bcert.issued_date,
+                bcert.issued_place, bcert.act_number, pas.series, pas.number, pas.issued_by,
+                pas.issued_date, pas.issued_place]
 
-    def __build_personal_datas(self, out_name: str = __DefaultOutName, out_dir: Path = __DefaultOutDir,
-                               time_stamp: bool = __UseTimeStamps):
-        out_name = "personal_data_" + out_name
-        fields = ["ID", "Last_Name", "First_Name", "Middle_Name", "Gender", "Birth_Date", "Birth_Place", "Citizenship",
-                  "Notes"]
-        rows = []
-        for card in self.__cards:
-            pid = card.Id
-            pd = card.PersonalData
-            row = [pid, pd.last_name, pd.first_name, pd.middle_name, str(pd.gender), str(pd.birth_date),
-                   pd.birth_place, str(pd.citizenship), pd.notes]
-            rows.append(row)
-        raw_csv = RawCSV(fields, rows)
-
-        CsvBuilder.Build_CSV(raw_csv, out_name=out_name, out_dir=out_dir, time_stamp=time_stamp)
-
-    def __build_document_datas(self, out_name: str = __DefaultOutName, out_dir: Path = __DefaultOutDir,
-                               time_stamp: bool = __UseTimeStamps):
-        out_name = "document_data_" + out_name
-        fields = ["ID", "SNILS", "VISA", "B_Series", "B_Number", "B_IssuedBy", "B_IssuedDate", "B_IssuedPlace",
-                  "B_ActNumber", "P_Series", "P_Number", "P_IssuedBy", "P_IssuedDate", "P_IssuedPlace"]
-        rows = []
-        for card in self.__cards:
-            pid = card.Id
-            doc = card.Document
-            bcert = doc.birth_certificate
-            pas = doc.passport
-            row = [pid, doc.snils, doc.visa, bcert.series, bcert.number, bcert.issued_by, str(bcert.issued_date),
-                   bcert.issued_place, bcert.act_number, pas.series, pas.number, pas.issued_by,
-                   str(pas.issued_date), pas.issued_place]
-
-            rows.append(row)
-        raw_csv = RawCSV(fields, rows)
-
-        CsvBuilder.Build_CSV(raw_csv, out_name=out_name, out_dir=out_dir, time_stamp=time_stamp)
-
-    def __build_contact_datas(self, out_name: str = __DefaultOutName, out_dir: Path = __DefaultOutDir,
-                              time_stamp: bool = __UseTimeStamps):
-        out_name = "contact_data_" + out_name
-        fields = ["ID", "Permanent_Address", "Temporary_Address", "Temporary_Address_End_Date", "Fact_Address",
-                  "Email", "Work_Phone", "Mobile_Phone", "Home_Phone"]
-
-        rows = []
-        for card in self.__cards:
-            pid = card.Id
-            cd = card.ContactData
-            row = [pid, cd.permanent_address, cd.temporary_address, str(cd.temporary_address_end_date),
-                   cd.fact_address, cd.email, cd.work_phone, cd.mobile_phone, cd.home_phone]
-            rows.append(row)
-
-        raw_csv = RawCSV(fields, rows)
-
-        CsvBuilder.Build_CSV(raw_csv, out_name=out_name, out_dir=out_dir, time_stamp=time_stamp)
-
-    def __build_worker_datas(self, out_name: str = __DefaultOutName, out_dir: Path = __DefaultOutDir,
-                             time_stamp: bool = __UseTimeStamps):
-        out_name = "worker_data_" + out_name
-
-        fields = ["ID", "Work_Start_Date", "Work_End_Date", "Teacher_Start_Date"]
-        rows = []
-        for card in self.__cards:
-            pid = card.Id
-            wd = card.WorkerData
-            row = [pid, str(wd.work_start_date), str(wd.work_end_date), str(wd.teacher_start_date)]
-            rows.append(row)
-
-        raw_csv = RawCSV(fields, rows)
-
-        CsvBuilder.Build_CSV(raw_csv, out_name=out_name, out_dir=out_dir, time_stamp=time_stamp)
+    @staticmethod
+    def contact_data_row(card: PeopleCard) -> list:
+        cd = card.ContactData
+        return [card.Id, cd.permanent_address, cd.temporary_address, cd.temporary_address_end_date,
+                cd.fact_address, cd.email, cd.work_phone, cd.mobile_phone, cd.home_phone]
+
+    @staticmethod
+    def worker_data_row(card: PeopleCard) -> list:
+        wd = card.WorkerData
+        return [card.Id, wd.work_start_date, wd.work_end_date, wd.teacher_start_date]
+
+    def Tables(self) -> list:
+        """
+        :return: list of (name prefix, fields, row function) of every out table
+        """
+
+        return [("personal_data_", self.PersonalDataFields, self.personal_data_row),
+                ("document_data_", self.DocumentDataFields, self.document_data_row),
+                ("contact_data_", self.ContactDataFields, self.contact_data_row),
+                ("worker_data_", self.WorkerDataFields, self.worker_data_row)]
+
+    def Export(self, sink_factory, out_name: str = __DefaultOutName) -> int:
+        """
+        one pass over cards, every card is fanned out to sinks of all tables at once
+        :param sink_factory: function(name, fields) -> sink with append(row) and close()
+        :param out_name: name of out tables, prefixed with name of table
+        :return: count of exported cards
+        """
+
+        sinks = []
+        try:
+            for prefix, fields, row in self.Tables():
+                sinks.append((sink_factory(prefix + out_name, fields), row))
+
+            count = 0
+            for card in self.__cards:
+                with self.Metrics.Stage("export") if self.Metrics is not None else nullcontext():
+                    for sink, row in sinks:
+                        sink.append(row(card))
+                count += 1
+        finally:
+            for sink, row in sinks:
+                sink.close()
+
+        return count
 
     def Build(self, out_name: str = __DefaultOutName, out_dir: Path = __DefaultOutDir,
-              time_stamp: bool = __UseTimeStamps):
+              time_stamp: bool = __UseTimeStamps, batch_size: int = 5000) -> int:
+        """
+        write cards to all four csv files in one pass with large batched writes
+        :param batch_size: int - rows written to csv at once
+        :return: count of written cards
+        """
+
+        return self.Export(lambda name, fields: CsvStreamWriter(fields, name, out_dir, time_stamp,
+                                                                flush_every=batch_size, batch_size=batch_size),
+                           out_name)
+
+    def Build_parquet(self, out_name: str = __DefaultOutName, out_dir: Path = __DefaultOutDir,
+                      time_stamp: bool = __UseTimeStamps, row_group_size: int = 10000) -> int:
+        """
+        write cards to four typed parquet files in one pass. Needs pyarrow
+        :param row_group_size: int - rows per parquet row group
+        :return: count of written cards
+        """
+        from src.arrow_builder import ParquetStreamWriter
+
+        return self.Export(lambda name, fields: ParquetStreamWriter(fields, name, out_dir, time_stamp,
+                                                                    row_group_size=row_group_size),
+                           out_name)
+
+    def Build_sqlite(self, path: Path = None, batch_size: int = 5000) -> int:
+        """
+        upsert cards to indexed SQLite database, see SqliteCardStore
+        :param path: path of database, SqliteCardStore.DefaultPath if None
+        :param batch_size: int - cards per transaction
+        :return: count of written cards
+        """
+        from src.sqlite_sink import SqliteCardStore
+
+        store = SqliteCardStore(path) if path is not None else SqliteCardStore()
+        try:
+            return store.Write(self.__cards, batch_size=batch_size)
+        finally:
+            store.close()
+
+    @staticmethod
+    def Build_delta(delta, out_name: str = __DefaultOutName, out_dir: Path = __DefaultOutDir,
+                    time_stamp: bool = __UseTimeStamps):
+        """
+        write people added, changed and removed since previous run
+        :param delta: CardsDelta
+        """
+
+        rows = [[pid, "added"] for pid in delta.added] + [[pid, "changed"] for pid in delta.changed] + \
+               [[pid, "removed"] for pid in delta.removed]
+        CsvBuilder.Build_CSV(RawCSV(["ID", "Change"], rows), out_name="delta_" + out_name, out_dir=out_dir,
+                             time_stamp=time_stamp)
+
+    def Stream(self, out_name: str = __DefaultOutName, out_dir: Path = __DefaultOutDir,
+               time_stamp: bool = __UseTimeStamps, flush_every: int = 100) -> int:
+        """
+        write cards to all four csv files in one pass as they come. Memory doesn't depend on count of cards,
+        written rows are on disk even if the source of cards fails
+        :param flush_every: int - flush files every flush_every cards
+        :return: count of written cards
+        """
 
-        self.__build_personal_datas(out_name, out_dir, time_stamp)
-        self.__build_document_datas(out_name, out_dir, time_stamp)
-        self.__build_contact_datas(out_name, out_dir, time_stamp)
-        self.__build_worker_datas(out_name, out_dir, time_stamp)
+        return self.Export(lambda name, fields: CsvStreamWriter(fields, name, out_dir, time_stamp,
+                                                                flush_every=flush_every, batch_size=flush_every),
+                           out_name)
 
 
 if __name__ == "__main__":
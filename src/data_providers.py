@@ -1,6 +1,8 @@
 import json
 from pathlib import Path
+from urllib.parse import urlparse, parse_qs
 from enum import Enum
+import copy
 import os
 
 
@@ -9,6 +11,12 @@ class WebServices(Enum):
     Gosuslugi = "gosuslugi"
 
 
+DATA_DIR = Path(__file__).parent / "data"
+
+CARD_SECTIONS = ["personal_data", "document", "contact_data", "worker_data"]
+CARD_VALUES_SECTIONS = ["personal_data_xpaths", "document_xpaths", "contact_data_xpaths", "worker_data_xpaths"]
+
+
 class EnvDataProvider:
     """
     provide to env variables
@@ -29,34 +37,82 @@ class JsonDataProvider:
     """
     DATA_PATH = None
 
+    __cache = {}  # DATA_PATH -> parsed json, every file is read once per process
+
     def __init__(self):
         """
-        open file from DATA_PATH and parse json file to rawData
+        take parsed json file of DATA_PATH to rawData, file is opened and parsed only by first provider.
+        rawData is a copy, changes of one provider don't reach the shared cache and other providers
         """
 
         if self.DATA_PATH is not None:
-            if Path(self.DATA_PATH).exists():
-                with open(self.DATA_PATH) as file:
-                    self.rawData = json.load(file)
-                    print(f"[+]{self.__class__.__name__}: init")
-            else:
-                raise ValueError(f"[x]{self.__class__.__name__}: file in the path {self.DATA_PATH} is not found")
+            path = Path(self.DATA_PATH)
+            if path not in JsonDataProvider.__cache:
+                if not path.exists():
+                    raise ValueError(f"[x]{self.__class__.__name__}: file in the path {self.DATA_PATH} is not found")
+                with open(path, encoding="utf-8") as file:
+                    JsonDataProvider.__cache[path] = json.load(file)
+                print(f"[+]{self.__class__.__name__}: init")
+            self.rawData = copy.deepcopy(JsonDataProvider.__cache[path])
         else:
             self.rawData = None
 
 
 class UrlsProvider(JsonDataProvider):
-    DATA_PATH = Path("./src/data/Urls.json").absolute()
+    DATA_PATH = DATA_DIR / "Urls.json"
+
+    @staticmethod
+    def PersonIdFromLink(link: str) -> int:
+        """
+        get id of person from 'person=' query parameter of people card link
+        """
+
+        return int(parse_qs(urlparse(link).query)["person"][0])
+
+    @staticmethod
+    def UniquePeopleLinks(links: [str], seen: set) -> [str]:
+        """
+        drop links of people already seen on previous pages, pagination shifts when people are added during crawl
+        :param links: people card links of page
+        :param seen: ids of seen people, ids of new links are added to it
+        :return: links of not seen people
+        """
+
+        unique = []
+        for link in links:
+            person_id = UrlsProvider.PersonIdFromLink(link)
+            if person_id not in seen:
+                seen.add(person_id)
+                unique.append(link)
+        if len(unique) < len(links):
+            print(f"[i]skip {len(links) - len(unique)} people seen on previous pages")
+
+        return unique
+
+    def __init__(self, school: int = None):
+        """
+        :param school: int - id of school in '{school}' of url templates, 'default_school' of Urls.json if None
+        """
 
-    def __init__(self):
         JsonDataProvider.__init__(self)
+        self.school = school if school is not None else self.rawData[WebServices.Dnevnik.value]["default_school"]
+
+    def With_school(self, school: int) -> "UrlsProvider":
+        """
+        :return: copy of provider for other school, without reading Urls.json again
+        """
+
+        provider = copy.copy(self)
+        provider.school = school
+        return provider
 
     def get(self, service: WebServices) -> dict:
-        return self.rawData[service.value]
+        return {key: value.format(school=self.school) if isinstance(value, str) else value
+                for key, value in self.rawData[service.value].items()}
 
 
 class XPathsProvider(JsonDataProvider):
-    DATA_PATH = Path("./src/data/XPaths.json").absolute()
+    DATA_PATH = DATA_DIR / "XPaths.json"
 
     @staticmethod
     def FullXPathToRelative(parent: str, xpath: str) -> str:
@@ -77,7 +133,11 @@ class XPathsProvider(JsonDataProvider):
         JsonDataProvider.__init__(self)
 
     def get(self, service: WebServices) -> dict:
-        return self.rawData[service.value]
+        """
+        :return: copy of xpaths tree of service, callers may change it (e.g. FullXPathsToRelatives)
+        """
+
+        return copy.deepcopy(self.rawData[service.value])
 
 
 if __name__ == "__main__":
@@ -0,0 +1,134 @@
+from src.core_driver import CoreDriver, CardExtraction
+from selenium.common.exceptions import WebDriverException
+from urllib3.exceptions import HTTPError
+
+from queue import Queue, Empty
+from threading import Thread, Lock
+
+
+class DriverPool:
+    """
+    The class shards 'current peoples pages' across several logged in CoreDriver workers
+    """
+
+    def __init__(self, workers: int = 2, driver_kwargs: dict = None,
+                 extraction: CardExtraction = CardExtraction.Snapshot, parse_delay: float = 0,
+                 max_restarts: int = 3, max_page_attempts: int = 3):
+        """
+        Constructor of DriverPool
+        :param workers: int - count of browsers
+        :param driver_kwargs: dict - kwargs of every CoreDriver
+        :param extraction: CardExtraction - Script or Snapshot, web elements can't outlive their browser
+        :param parse_delay: float - minimum time spent on every people card by every worker
+        :param max_restarts: int - max browser restarts per worker
+        :param max_page_attempts: int - max attempts of one page, across all workers
+        """
+
+        if extraction is CardExtraction.Elements:
+            raise ValueError(f"[x]{self.__class__.__name__}: extraction {extraction} isn't supported")
+
+        self.workers = workers
+        self.driver_kwargs = driver_kwargs if driver_kwargs is not None else {}
+        self.extraction = extraction
+        self.parse_delay = parse_delay
+        self.max_restarts = max_restarts
+        self.max_page_attempts = max_page_attempts
+        self.Failed_pages = []
+        self.Quarantine = []
+
+        self.__lock = Lock()
+        self.__attempts = {}
+
+    def __new_driver(self) -> CoreDriver:
+        driver = CoreDriver(**self.driver_kwargs)
+        driver.Login()
+        return driver
+
+    def __quit_driver(self, driver: CoreDriver):
+        """
+        quit driver of worker, its quarantined cards are kept by pool
+        """
+
+        with self.__lock:
+            self.Quarantine += driver.Quarantine
+        driver.Quit()
+
+    def __retry_page(self, page: int, pages: Queue):
+        with self.__lock:
+            self.__attempts[page] = self.__attempts.get(page, 0) + 1
+            if self.__attempts[page] < self.max_page_attempts:
+                pages.put(page)
+            else:
+                self.Failed_pages.append(page)
+                print(f"[x]{self.__class__.__name__}: page {page} failed {self.__attempts[page]} times")
+
+    def __work(self, index: int, driver: CoreDriver, pages: Queue, cards: dict):
+        restarts = 0
+        while True:
+            try:
+                page = pages.get_nowait()
+            except Empty:
+                break
+
+            if driver is None:
+                try:
+                    driver = self.__new_driver()
+                except Exception as ex:  # browser isn't started or login failed: worker can't go on
+                    print(f"[x]worker {index}: driver isn't started, stop: {type(ex).__name__} {ex}")
+                    self.__retry_page(page, pages)
+                    break
+
+            try:
+                page_cards = driver.Parse_current_peoples_page(page, self.parse_delay, self.extraction)
+            except (WebDriverException, HTTPError, OSError) as ex:
+                print(f"[x]worker {index}: page {page} failed: {ex}")
+                self.__retry_page(page, pages)
+                if driver is not None:
+                    self.__quit_driver(driver)
+                    driver = None
+                restarts += 1
+                if restarts > self.max_restarts:
+                    print(f"[x]worker {index}: too many restarts, stop")
+                    break
+                continue
+
+            with self.__lock:
+                for card in page_cards:
+                    cards[card.person_id] = card
+
+        if driver is not None:
+            self.__quit_driver(driver)
+
+    def Parse_current_peoples(self, debug: bool = False) -> list:
+        """
+        collect all 'peoples cards' from all 'current peoples pages' by all workers
+        :return: list of cards ordered by person_id, one per person
+        """
+
+        self.Failed_pages = []
+        self.Quarantine = []
+        self.__attempts = {}
+        first_driver = self.__new_driver()
+        max_peoples = 1 if debug else first_driver.Get_max_current_peoples_pages()
+
+        pages = Queue()
+        for i in range(1, max_peoples + 1):
+            pages.put(i)
+
+        cards = {}
+        drivers = [first_driver] + [None] * (min(self.workers, max_peoples) - 1)
+        threads = [Thread(target=self.__work, args=(index, driver, pages, cards), daemon=True)
+                   for index, driver in enumerate(drivers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        while not pages.empty():
+            self.Failed_pages.append(pages.get_nowait())
+        if self.Failed_pages:
+            print(f"[x]{self.__class__.__name__}: not collected pages {sorted(self.Failed_pages)}")
+        if self.Quarantine:
+            print(f"[x]{self.__class__.__name__}: quarantined cards {len(self.Quarantine)}")
+
+        return [cards[person_id] for person_id in sorted(cards)]
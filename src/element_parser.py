@@ -0,0 +1,131 @@
+from src.cards import PeopleCardWebElement
+from src.data_providers import XPathsProvider, WebServices
+from src.parsers import PersonalData, BirthCertificate, Passport, Document, ContactData, WorkerData, PeopleCard, \
+    Gender, Citizenship, DateConvert, Is_invalid_date
+from selenium.webdriver.remote.webelement import WebElement
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.select import Select
+from selenium.common.exceptions import NoSuchElementException
+
+
+class __Fields:
+    """
+    reader of fields of one card section. Not found field keeps its default and is recorded to missing,
+    date which can't be parsed is recorded to invalid, other fields of section are still read
+    """
+
+    def __init__(self, element: WebElement, xpaths: dict, section: str, missing: list, invalid: list):
+        self.element = element
+        self.xpaths = xpaths
+        self.section = section
+        self.missing = missing
+        self.invalid = invalid
+
+    def find(self, key: str):
+        try:
+            return self.element.find_element(By.XPATH, self.xpaths[key])
+        except NoSuchElementException:
+            self.missing.append(f"{self.section}.{key}")
+            return None
+
+    def value(self, key: str) -> str:
+        found = self.find(key)
+        return found.get_attribute("value") if found is not None else ''
+
+    def text(self, key: str) -> str:
+        found = self.find(key)
+        return found.text if found is not None else ''
+
+    def date(self, key: str):
+        raw_date = self.value(key)
+        if Is_invalid_date(raw_date):
+            self.invalid.append(f"{self.section}.{key}")
+        return DateConvert(raw_date)
+
+    def selected(self, key: str) -> bool:
+        found = self.find(key)
+        return found is not None and found.is_selected()
+
+    def option(self, key: str) -> str:
+        """
+        :return: text of selected option of select, the same as in-page script and snapshot reader return
+        """
+
+        found = self.find(key)
+        if found is None:
+            return ''
+        selected = Select(found).all_selected_options
+        return selected[0].text.strip() if selected else ''
+
+
+def __build_personal_data(fields: __Fields) -> PersonalData:
+    fields.find("sexF")  # gender is read from sexM, sexF is checked for completeness as in values tree
+    return PersonalData(last_name=fields.value("last_name"), first_name=fields.value("first_name"),
+                        middle_name=fields.value("middle_name"),
+                        gender=Gender.Male if fields.selected("sexM") else Gender.Female,
+                        birth_date=fields.date("birth_date"), birth_place=fields.value("birth_place"),
+                        citizenship=Citizenship.From_text(fields.option("citizenship")),
+                        notes=fields.text("notes"))
+
+
+def __build_birth_certificate(fields: __Fields) -> BirthCertificate:
+    return BirthCertificate(series=fields.value("series"), number=fields.value("number"),
+                            issued_by=fields.value("issued_by"), issued_date=fields.date("issued_date"),
+                            issued_place=fields.value("issued_place"), act_number=fields.value("act_number"))
+
+
+def __build_passport(fields: __Fields) -> Passport:
+    return Passport(series=fields.value("series"), number=fields.value("number"),
+                    issued_by=fields.value("issued_by"), issued_date=fields.date("issued_date"),
+                    issued_place=fields.value("issued_place"))
+
+
+def __build_document(element: WebElement, xpaths: dict, missing: list, invalid: list) -> Document:
+    fields = __Fields(element, xpaths, "document", missing, invalid)
+    birth_certificate = __build_birth_certificate(
+        __Fields(element, xpaths["birth_certificate_xpaths"], "document.birth_certificate", missing, invalid))
+    passport = __build_passport(__Fields(element, xpaths["passport_xpaths"], "document.passport", missing,
+                                         invalid))
+
+    return Document(snils=fields.value("snils"), visa=fields.value("visa"), birth_certificate=birth_certificate,
+                    passport=passport)
+
+
+def __build_contact_data(fields: __Fields) -> ContactData:
+    return ContactData(permanent_address=fields.value("permanent_address"),
+                       temporary_address=fields.value("temporary_address"),
+                       temporary_address_end_date=fields.date("temporary_address_end_date"),
+                       fact_address=fields.value("fact_address"), email=fields.value("email"),
+                       work_phone=fields.value("work_phone"), mobile_phone=fields.value("mobile_phone"),
+                       home_phone=fields.value("home_phone"))
+
+
+def __build_worker_data(fields: __Fields) -> WorkerData:
+    return WorkerData(work_start_date=fields.date("work_start_date"), work_end_date=fields.date("work_end_date"),
+                      teacher_start_date=fields.date("teacher_start_date"))
+
+
+def ParsePeopleCardElements(card: PeopleCardWebElement, xpaths_provider: XPathsProvider) -> PeopleCard:
+    """
+    parse people card of web elements collected by CoreDriver, needs alive driver.
+    Fields not found on card page are listed in missing fields of people card, dates which can't be parsed
+    in invalid fields
+    :param card: PeopleCardWebElement
+    :param xpaths_provider: provider of XPaths.json
+    :return: people card
+    """
+
+    dnevnik_xpaths = xpaths_provider.get(WebServices.Dnevnik)
+    missing = []
+    invalid = []
+
+    pdata = __build_personal_data(__Fields(card.personal_data, dnevnik_xpaths["personal_data_xpaths"],
+                                           "personal_data", missing, invalid))
+    doc = __build_document(card.document, dnevnik_xpaths["document_xpaths"], missing, invalid)
+    cdata = __build_contact_data(__Fields(card.contact_data, dnevnik_xpaths["contact_data_xpaths"],
+                                          "contact_data", missing, invalid))
+    wdata = __build_worker_data(__Fields(card.worker_data, dnevnik_xpaths["worker_data_xpaths"],
+                                         "worker_data", missing, invalid))
+
+    return PeopleCard(person_id=card.person_id, personal_data=pdata, document=doc, contact_data=cdata,
+                      worker_data=wdata, missing_fields=missing, invalid_fields=invalid)
@@ -0,0 +1,205 @@
+from src.cards import PeopleCardSnapshot
+from src.data_providers import UrlsProvider, XPathsProvider, WebServices
+
+from pathlib import Path
+import hashlib
+import sqlite3
+import time
+import zlib
+from threading import Lock
+
+
+class HtmlCache:
+    """
+    On-disk cache of fetched pages. Pages are zlib compressed and stored once per content hash,
+    the index maps url to the hash of its latest content. Least recently used urls are evicted over max_bytes
+    down to evict_to share of it. Size of cache is counted in memory, one process writes the cache
+    """
+
+    DefaultDir = Path("./out/html_cache")
+
+    def __init__(self, cache_dir: Path = DefaultDir, max_bytes: int = 2 * 1024 ** 3, level: int = 6,
+                 evict_to: float = 0.9):
+        """
+        Constructor of HtmlCache
+        :param cache_dir: directory of cache, created if not exists
+        :param max_bytes: int - max size of compressed pages on disk
+        :param level: int - zlib compression level
+        :param evict_to: float - share of max_bytes left after eviction, next eviction is due after some puts
+        """
+
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.evict_to = evict_to
+        self.level = level
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.__lock = Lock()
+        self.Connection = sqlite3.connect(str((self.cache_dir / "index.sqlite3").absolute()),
+                                          check_same_thread=False)
+        self.Connection.execute("PRAGMA journal_mode=WAL")
+        with self.Connection:
+            self.Connection.executescript("""
+                CREATE TABLE IF NOT EXISTS blobs (hash TEXT PRIMARY KEY, size INTEGER NOT NULL);
+                CREATE TABLE IF NOT EXISTS urls (url TEXT PRIMARY KEY, hash TEXT NOT NULL,
+                                                 accessed_at REAL NOT NULL);
+                CREATE INDEX IF NOT EXISTS urls_accessed_at ON urls (accessed_at);
+                CREATE INDEX IF NOT EXISTS urls_hash ON urls (hash);
+            """)
+        self.__size = self.Size()
+
+    def close(self):
+        self.Connection.close()
+
+    def __blob_path(self, content_hash: str) -> Path:
+        return self.cache_dir / content_hash[:2] / f"{content_hash}.html.z"
+
+    def Size(self) -> int:
+        """
+        :return: size of compressed pages from index, Put and eviction use the counter kept in memory
+        """
+
+        return self.Connection.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+
+    def __drop_blob(self, content_hash: str):
+        """
+        delete page content if no url refers to it
+        """
+
+        if self.Connection.execute("SELECT 1 FROM urls WHERE hash = ?", (content_hash,)).fetchone() is not None:
+            return
+        row = self.Connection.execute("SELECT size FROM blobs WHERE hash = ?", (content_hash,)).fetchone()
+        if row is None:
+            return
+        self.Connection.execute("DELETE FROM blobs WHERE hash = ?", (content_hash,))
+        self.__blob_path(content_hash).unlink(missing_ok=True)
+        self.__size -= row[0]
+
+    def Put(self, url: str, page_source: str):
+        """
+        store page content of url
+        """
+
+        data = page_source.encode("utf-8")
+        content_hash = hashlib.sha256(data).hexdigest()
+        path = self.__blob_path(content_hash)
+        with self.__lock, self.Connection:
+            if self.Connection.execute("SELECT 1 FROM blobs WHERE hash = ?", (content_hash,)).fetchone() is None:
+                compressed = zlib.compress(data, self.level)
+                path.parent.mkdir(exist_ok=True)
+                path.write_bytes(compressed)
+                self.Connection.execute("INSERT INTO blobs (hash, size) VALUES (?, ?)",
+                                        (content_hash, len(compressed)))
+                self.__size += len(compressed)
+            previous = self.Connection.execute("SELECT hash FROM urls WHERE url = ?", (url,)).fetchone()
+            self.Connection.execute("INSERT OR REPLACE INTO urls (url, hash, accessed_at) VALUES (?, ?, ?)",
+                                    (url, content_hash, time.time()))
+            if previous is not None and previous[0] != content_hash:
+                self.__drop_blob(previous[0])
+            if self.__size > self.max_bytes:
+                self.__evict()
+
+    def Get(self, url: str):
+        """
+        :return: latest page content of url or None if url isn't cached
+        """
+
+        with self.__lock, self.Connection:
+            row = self.Connection.execute("SELECT hash FROM urls WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                return None
+            path = self.__blob_path(row[0])
+            if not path.exists():
+                return None
+            self.Connection.execute("UPDATE urls SET accessed_at = ? WHERE url = ?", (time.time(), url))
+
+        return zlib.decompress(path.read_bytes()).decode("utf-8")
+
+    def __evict(self):
+        """
+        delete least recently used urls and their unreferenced pages until cache is under evict_to of max_bytes.
+        Called inside Put transaction when cache is over max_bytes
+        """
+
+        target = self.max_bytes * self.evict_to
+        while self.__size > target:
+            oldest = self.Connection.execute("SELECT url, hash FROM urls ORDER BY accessed_at LIMIT 256").fetchall()
+            if not oldest:
+                break
+            for url, content_hash in oldest:
+                if self.__size <= target:
+                    break
+                self.Connection.execute("DELETE FROM urls WHERE url = ?", (url,))
+                self.__drop_blob(content_hash)
+
+
+class ReplayCrawler:
+    """
+    The class replays crawl from HtmlCache: no browser, no login, no network
+    """
+
+    def __init__(self, cache: HtmlCache, school: int = None):
+        """
+        Constructor of ReplayCrawler
+        :param cache: HtmlCache filled by crawl
+        :param school: int - id of replayed school, default school of Urls.json if None
+        """
+
+        self.Cache = cache
+        self.Quarantine = []
+        self.Failed_pages = []
+        self.UrlsProvider = UrlsProvider(school)
+        self.XPathsProvider = XPathsProvider()
+
+    def Get(self, url: str) -> str:
+        page_source = self.Cache.Get(url)
+        if page_source is None:
+            raise KeyError(f"[x]{self.__class__.__name__}: {url} isn't cached")
+        return page_source
+
+    def Get_max_current_peoples_pages(self) -> int:
+        from src.snapshot_parser import ExtractMaxPages  # lxml is loaded only by replay, not by cache of crawl
+
+        url = self.UrlsProvider.get(WebServices.Dnevnik)["current_peoples"]
+        max_count_xpath = self.XPathsProvider.get(WebServices.Dnevnik)["max_current_peoples"]
+
+        return ExtractMaxPages(self.Get(url), max_count_xpath)
+
+    def Get_current_peoples_links(self, page: int) -> [str]:
+        from src.snapshot_parser import ExtractPeopleLinks
+
+        url = self.UrlsProvider.get(WebServices.Dnevnik)["current_peoples_iterations"] + str(page)
+        table_xpath = self.XPathsProvider.get(WebServices.Dnevnik)["current_peoples_table"]
+
+        return ExtractPeopleLinks(self.Get(url), table_xpath, url)
+
+    def Get_people_card(self, link: str) -> PeopleCardSnapshot:
+        return PeopleCardSnapshot(person_id=UrlsProvider.PersonIdFromLink(link), page_source=self.Get(link))
+
+    def Iter_current_peoples(self, debug: bool = False):
+        """
+        yield cached 'peoples cards' of all cached 'current peoples pages', not cached cards are skipped.
+        Skipped cards are listed in Quarantine and skipped pages in Failed_pages, as in live crawlers
+        :return: generator of PeopleCardSnapshots
+        """
+
+        max_peoples = 1 if debug else self.Get_max_current_peoples_pages()
+
+        self.Quarantine = []
+        self.Failed_pages = []
+        seen = set()
+        for i in range(1, max_peoples + 1):
+            try:
+                links = self.Get_current_peoples_links(i)
+            except KeyError as ex:
+                print(ex)
+                self.Failed_pages.append(i)
+                continue
+            for link in UrlsProvider.UniquePeopleLinks(links, seen):
+                try:
+                    yield self.Get_people_card(link)
+                except KeyError as ex:
+                    print(ex)
+                    self.Quarantine.append(link)
+
+    def Parse_current_peoples(self, debug: bool = False) -> [PeopleCardSnapshot]:
+        return list(self.Iter_current_peoples(debug))
@@ -0,0 +1,335 @@
+from src.cards import PeopleCardSnapshot
+from src.data_providers import UrlsProvider, XPathsProvider, WebServices
+from src.snapshot_parser import ExtractMaxPages, ExtractPeopleLinks
+
+from http.cookies import SimpleCookie
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import TYPE_CHECKING
+import time
+import requests
+from requests.adapters import HTTPAdapter
+
+if TYPE_CHECKING:
+    from src.core_driver import CoreDriver
+
+
+DEFAULT_HEADERS = {
+    "Accept": "text/html,application/xhtml+xml",
+    "Accept-Language": "ru-RU,ru;q=0.9",
+}
+
+
+def ExportDriverCookies(core_driver: "CoreDriver") -> [dict]:
+    """
+    export all cookies of logged in driver, not only cookies of current page domain
+    :param core_driver: logged in CoreDriver
+    :return: selenium-like cookie dicts
+    """
+
+    return core_driver.Get_all_cookies()
+
+
+def ExportDriverUserAgent(core_driver: "CoreDriver") -> str:
+    return core_driver.Driver.execute_script("return navigator.userAgent")
+
+
+class HttpSession:
+    """
+    The class fetches 'Current Peoples' pages and people cards over plain HTTP with cookies of logged in CoreDriver.
+    Keep-alive connections are pooled, nothing is rendered
+    """
+
+    def __init__(self, cookies: [dict], user_agent: str = None, pool_size: int = 10, timeout: float = 30,
+                 cache=None, throttle=None, school: int = None, limit=None):
+        """
+        Constructor of HttpSession
+        :param cookies: selenium-like cookie dicts (name, value, domain, path)
+        :param user_agent: user agent of browser the cookies were issued to
+        :param pool_size: int - max keep-alive connections per host
+        :param timeout: float - timeout of every request in seconds
+        :param cache: HtmlCache - store html of every fetched page
+        :param throttle: AimdThrottle - adaptive pace of requests
+        :param school: int - id of crawled school, default school of Urls.json if None
+        :param limit: semaphore shared with other sessions (threads or processes), caps their requests in flight
+        """
+
+        self.timeout = timeout
+        self.Cache = cache
+        self.Throttle = throttle
+        self.Limit = limit
+        self.cookies = cookies
+        self.user_agent = user_agent
+        self.Session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.Session.mount("https://", adapter)
+        self.Session.mount("http://", adapter)
+        self.Session.headers.update(DEFAULT_HEADERS)
+        if user_agent is not None:
+            self.Session.headers["User-Agent"] = user_agent
+        for cookie in cookies:
+            self.Session.cookies.set(cookie["name"], cookie["value"], domain=cookie.get("domain", ""),
+                                     path=cookie.get("path", "/"))
+
+        self.Quarantine = []
+        self.Failed_pages = []
+        self.UrlsProvider = UrlsProvider(school)
+        self.XPathsProvider = XPathsProvider()
+
+        print(f"[+]HttpSession {self} init:")
+        print(f"----cookies={len(cookies)}")
+
+    @staticmethod
+    def From_driver(core_driver: "CoreDriver", pool_size: int = 10, timeout: float = 30) -> "HttpSession":
+        """
+        hand off session of logged in CoreDriver to HttpSession, with its cache and throttle
+        :param core_driver: logged in CoreDriver
+        :return: HttpSession
+        """
+
+        return HttpSession(ExportDriverCookies(core_driver), ExportDriverUserAgent(core_driver),
+                           pool_size=pool_size, timeout=timeout, cache=core_driver.Cache,
+                           throttle=core_driver.Throttle)
+
+    @staticmethod
+    def From_store(store, pool_size: int = 10, timeout: float = 30, cache=None, throttle=None):
+        """
+        HttpSession with cookies of previous run, without browser
+        :param store: SessionStore
+        :return: HttpSession or None if nothing is saved or saved session is expired
+        """
+
+        cookies = store.Load()
+        if not cookies:
+            return None
+        session = HttpSession(cookies, store.user_agent, pool_size=pool_size, timeout=timeout, cache=cache,
+                              throttle=throttle)
+        if session.Is_logged_in():
+            print("[i]Login skipped: saved session is valid")
+            return session
+        session.close()
+        print("[i]saved session is expired")
+        return None
+
+    def close(self):
+        self.Session.close()
+
+    def Is_logged_in(self) -> bool:
+        """
+        cheap check of session by one request: 'Current Peoples' isn't redirected to login
+        :return: bool
+        """
+
+        url = self.UrlsProvider.get(WebServices.Dnevnik)["current_peoples"]
+        try:
+            response = self.Session.get(url, timeout=self.timeout)
+        except requests.RequestException as ex:
+            print(f"[x]{self}: session check failed: {ex}")
+            return False
+        return response.ok and response.url.startswith(url)
+
+    def __get(self, url: str) -> str:
+        with self.Limit if self.Limit is not None else nullcontext():
+            response = self.Session.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        if self.Cache is not None:
+            self.Cache.Put(url, response.text)
+        return response.text
+
+    def Get(self, url: str) -> str:
+        """
+        fetch html of page. With throttle request waits for its slot and overloaded request is retried
+        :param url: page url
+        :return: html
+        """
+
+        if self.Throttle is None:
+            return self.__get(url)
+
+        for attempt in range(self.Throttle.retries + 1):
+            time.sleep(self.Throttle.Reserve())
+            started = time.monotonic()
+            try:
+                page_source = self.__get(url)
+            except requests.RequestException as ex:
+                self.Throttle.Observe_error(time.monotonic() - started, ex)
+                if attempt == self.Throttle.retries or not self.Throttle.Is_overload(ex):
+                    raise
+                print(f"[i]retry {url}: {ex}")
+                continue
+            self.Throttle.Observe(time.monotonic() - started)
+            return page_source
+
+    def Get_max_current_peoples_pages(self) -> int:
+        url = self.UrlsProvider.get(WebServices.Dnevnik)["current_peoples"]
+        max_count_xpath = self.XPathsProvider.get(WebServices.Dnevnik)["max_current_peoples"]
+
+        return ExtractMaxPages(self.Get(url), max_count_xpath)
+
+    def Get_current_peoples_links(self, page: int) -> [str]:
+        url = self.UrlsProvider.get(WebServices.Dnevnik)["current_peoples_iterations"] + str(page)
+        table_xpath = self.XPathsProvider.get(WebServices.Dnevnik)["current_peoples_table"]
+
+        return ExtractPeopleLinks(self.Get(url), table_xpath, url)
+
+    def Get_people_card(self, link: str) -> PeopleCardSnapshot:
+        return PeopleCardSnapshot(person_id=UrlsProvider.PersonIdFromLink(link), page_source=self.Get(link))
+
+    def __fetch_card(self, link: str):
+        """
+        :return: card or None if fetch failed after all retries, link is put to quarantine
+        """
+
+        try:
+            return self.Get_people_card(link)
+        except requests.RequestException as ex:
+            print(f"[x]{self}: people card {link} is quarantined: {ex}")
+            self.Quarantine.append(link)
+            return None
+
+    def Iter_current_peoples(self, debug: bool = False, state=None):
+        """
+        yield 'peoples cards' from all 'current peoples pages' one by one. Links of next page are fetched
+        in background while cards of current page are fetched, people seen on previous pages are skipped.
+        Failed cards go to Quarantine and failed pages to Failed_pages, crawl goes on
+        :param state: CrawlStateStore - resume crawl from it, stored cards are yielded without fetching.
+        Page with quarantined cards isn't marked done, resumed crawl fetches them again. Run of state is finished
+        when crawl ends complete
+        :return: generator of PeopleCardSnapshots
+        """
+
+        max_peoples = 1 if debug else self.Get_max_current_peoples_pages()
+
+        def prefetch(page: int):
+            if page > max_peoples or (state is not None and state.Page_links(page) is not None):
+                return None
+            return prefetcher.submit(self.Get_current_peoples_links, page)
+
+        self.Quarantine = []
+        self.Failed_pages = []
+        seen = set()
+        with ThreadPoolExecutor(max_workers=1) as prefetcher:
+            next_links = prefetch(1)
+            for i in range(1, max_peoples + 1):
+                page_links, next_links = next_links, prefetch(i + 1)
+                get_links = self.Get_current_peoples_links if page_links is None else \
+                    lambda page, future=page_links: future.result()
+
+                try:
+                    if state is not None:
+                        yield from state.Iter_page(i, get_links, self.__fetch_card, seen)
+                        continue
+
+                    links = UrlsProvider.UniquePeopleLinks(get_links(i), seen)
+                except requests.RequestException as ex:
+                    print(f"[x]{self}: page {i} failed: {ex}")
+                    self.Failed_pages.append(i)
+                    continue
+
+                print(f"[i]former {len(links)} links start parse")
+                for link in links:
+                    card = self.__fetch_card(link)
+                    if card is not None:
+                        yield card
+
+        if self.Quarantine or self.Failed_pages:
+            print(f"[x]{self}: quarantined cards {len(self.Quarantine)}, failed pages {self.Failed_pages}")
+        if state is not None:
+            state.Finish_run(complete=not self.Quarantine and not self.Failed_pages)
+
+    def Parse_current_peoples(self, debug: bool = False, state=None) -> [PeopleCardSnapshot]:
+        """
+        collect all 'peoples cards' from all 'current peoples pages'
+        :param state: CrawlStateStore - resume crawl from it
+        :return: list of PeopleCardSnapshots
+        """
+
+        return list(self.Iter_current_peoples(debug, state))
+
+
+class AsyncHttpSession:
+    """
+    asyncio version of HttpSession. One session drives many concurrent fetches over one connection pool
+    """
+
+    def __init__(self, cookies: [dict], user_agent: str = None, pool_size: int = 10, timeout: float = 30,
+                 cache=None, school: int = None):
+        """
+        Constructor of AsyncHttpSession. Must be created inside running event loop
+        :param cookies: selenium-like cookie dicts (name, value, domain, path)
+        :param user_agent: user agent of browser the cookies were issued to
+        :param pool_size: int - max open connections
+        :param timeout: float - timeout of every request in seconds
+        :param cache: HtmlCache - store html of every fetched page
+        :param school: int - id of crawled school, default school of Urls.json if None
+        """
+
+        self.Cache = cache
+        headers = dict(DEFAULT_HEADERS)
+        if user_agent is not None:
+            headers["User-Agent"] = user_agent
+
+        import aiohttp  # loaded only by async crawls
+        from yarl import URL
+
+        jar = aiohttp.CookieJar(unsafe=True)  # accept cookies of hosts addressed by ip, like local stand-ins
+        for cookie in cookies:
+            morsel = SimpleCookie()
+            morsel[cookie["name"]] = cookie["value"]
+            morsel[cookie["name"]]["domain"] = cookie.get("domain", "")
+            morsel[cookie["name"]]["path"] = cookie.get("path", "/")
+            jar.update_cookies(morsel, URL(f"https://{cookie.get('domain', '').lstrip('.')}/"))
+
+        self.Session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=pool_size), cookie_jar=jar,
+                                             headers=headers, timeout=aiohttp.ClientTimeout(total=timeout))
+
+        self.UrlsProvider = UrlsProvider(school)
+        self.XPathsProvider = XPathsProvider()
+
+        print(f"[+]AsyncHttpSession {self} init:")
+        print(f"----cookies={len(cookies)}")
+
+    @staticmethod
+    def From_driver(core_driver: "CoreDriver", pool_size: int = 10, timeout: float = 30,
+                    school: int = None) -> "AsyncHttpSession":
+        """
+        hand off session of logged in CoreDriver to AsyncHttpSession. Must be called inside running event loop
+        :param core_driver: logged in CoreDriver
+        :param school: int - id of crawled school, default school of Urls.json if None
+        :return: AsyncHttpSession
+        """
+
+        return AsyncHttpSession(ExportDriverCookies(core_driver), ExportDriverUserAgent(core_driver),
+                                pool_size=pool_size, timeout=timeout, cache=core_driver.Cache, school=school)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def close(self):
+        await self.Session.close()
+
+    async def Get(self, url: str) -> str:
+        async with self.Session.get(url) as response:
+            response.raise_for_status()
+            page_source = await response.text()
+        if self.Cache is not None:
+            self.Cache.Put(url, page_source)
+        return page_source
+
+    async def Get_max_current_peoples_pages(self) -> int:
+        url = self.UrlsProvider.get(WebServices.Dnevnik)["current_peoples"]
+        max_count_xpath = self.XPathsProvider.get(WebServices.Dnevnik)["max_current_peoples"]
+
+        return ExtractMaxPages(await self.Get(url), max_count_xpath)
+
+    async def Get_current_peoples_links(self, page: int) -> [str]:
+        url = self.UrlsProvider.get(WebServices.Dnevnik)["current_peoples_iterations"] + str(page)
+        table_xpath = self.XPathsProvider.get(WebServices.Dnevnik)["current_peoples_table"]
+
+        return ExtractPeopleLinks(await self.Get(url), table_xpath, url)
+
+    async def Get_people_card(self, link: str) -> PeopleCardSnapshot:
+        return PeopleCardSnapshot(person_id=UrlsProvider.PersonIdFromLink(link), page_source=await self.Get(link))
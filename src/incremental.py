@@ -0,0 +1,185 @@
+from src.cards import PeopleCardValues, PeopleCardSnapshot
+from src.data_providers import XPathsProvider, WebServices
+from src.snapshot_parser import CompiledXPaths, SnapshotFingerprint, SnapshotRoot, ExtractSnapshotValues
+from src.parsers import ParsePeopleCard, BuildPeopleCard, PARSER_VERSION
+
+from dataclasses import dataclass, field
+from pathlib import Path
+import hashlib
+import sqlite3
+import pickle
+import json
+
+
+def ParserFingerprint(xpaths_provider: XPathsProvider) -> str:
+    """
+    fingerprint of parser: PARSER_VERSION and XPaths.json tree. Stored cards of other parser are parsed again
+    :return: hex digest
+    """
+
+    xpaths = json.dumps(xpaths_provider.get(WebServices.Dnevnik), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(f"{PARSER_VERSION}:{xpaths}".encode("utf-8")).hexdigest()
+
+
+def CardFingerprint(card, xpaths_provider: XPathsProvider, root=None) -> str:
+    """
+    fingerprint of people card content
+    :param card: PeopleCardValues or PeopleCardSnapshot
+    :param xpaths_provider: provider of XPaths.json
+    :param root: SnapshotRoot of snapshot card, page is parsed if None
+    :return: hex digest
+    """
+
+    if isinstance(card, PeopleCardSnapshot):
+        return SnapshotFingerprint(card.page_source, CompiledXPaths.Of(xpaths_provider), root)
+    if isinstance(card, PeopleCardValues):
+        return hashlib.sha1(json.dumps(card.values, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+    raise ValueError(f"[x]CardFingerprint: card {type(card).__name__} can't be fingerprinted")
+
+
+@dataclass
+class CardsDelta:
+    added: list = field(default_factory=list)
+    changed: list = field(default_factory=list)
+    removed: list = field(default_factory=list)
+
+
+class FingerprintStore:
+    """
+    fingerprint, parser fingerprint and parsed PeopleCard of every person from previous runs, in SQLite
+    """
+
+    DefaultPath = Path("./out/fingerprints.sqlite3")
+
+    def __init__(self, path: Path = DefaultPath):
+        self.path = path
+        self.Connection = sqlite3.connect(str(Path(path).absolute()))
+        self.Connection.execute("PRAGMA journal_mode=WAL")
+        with self.Connection:
+            self.Connection.execute("""
+                CREATE TABLE IF NOT EXISTS fingerprints (person_id INTEGER PRIMARY KEY, fingerprint TEXT NOT NULL,
+                                                         card BLOB NOT NULL, parser TEXT)
+            """)
+            columns = [row[1] for row in self.Connection.execute("PRAGMA table_info(fingerprints)")]
+            if "parser" not in columns:  # store of version without it, its cards are parsed again
+                self.Connection.execute("ALTER TABLE fingerprints ADD COLUMN parser TEXT")
+
+    def close(self):
+        self.Connection.close()
+
+    def Get(self, person_id: int):
+        """
+        :return: (fingerprint, PeopleCard) of previous run or None
+        """
+
+        row = self.Connection.execute("SELECT fingerprint, card FROM fingerprints WHERE person_id = ?",
+                                      (person_id,)).fetchone()
+        return None if row is None else (row[0], pickle.loads(row[1]))
+
+    def Fingerprint(self, person_id: int):
+        """
+        :return: (fingerprint, parser fingerprint) of previous run or None
+        """
+
+        return self.Connection.execute("SELECT fingerprint, parser FROM fingerprints WHERE person_id = ?",
+                                       (person_id,)).fetchone()
+
+    def Put_many(self, records: [tuple]):
+        """
+        :param records: list of (person_id, fingerprint, parser fingerprint, PeopleCard)
+        """
+
+        with self.Connection:
+            self.Connection.executemany("INSERT OR REPLACE INTO fingerprints (person_id, fingerprint, parser, card) "
+                                        "VALUES (?, ?, ?, ?)",
+                                        [(person_id, fingerprint, parser, pickle.dumps(card))
+                                         for person_id, fingerprint, parser, card in records])
+
+    def Person_ids(self) -> set:
+        return {person_id for person_id, in self.Connection.execute("SELECT person_id FROM fingerprints")}
+
+    def Delete_many(self, person_ids: [int]):
+        with self.Connection:
+            self.Connection.executemany("DELETE FROM fingerprints WHERE person_id = ?",
+                                        [(person_id,) for person_id in person_ids])
+
+
+class IncrementalParser:
+    """
+    parse only people cards whose content changed since previous run, reuse previous PeopleCard for the rest.
+    Cards stored by other parser (PARSER_VERSION or XPaths.json) are parsed again, not reported as changed
+    """
+
+    def __init__(self, store: FingerprintStore, xpaths_provider: XPathsProvider, batch_size: int = 500):
+        """
+        Constructor of IncrementalParser
+        :param store: FingerprintStore of previous runs
+        :param xpaths_provider: provider of XPaths.json
+        :param batch_size: int - changed cards written to store per transaction
+        """
+
+        self.Store = store
+        self.XPathsProvider = xpaths_provider
+        self.batch_size = batch_size
+        self.Parser = ParserFingerprint(xpaths_provider)
+        self.Reparsed = 0
+        self.Delta = CardsDelta()
+        self.__seen = set()
+        self.__pending = []
+
+    def __flush(self):
+        if self.__pending:
+            self.Store.Put_many(self.__pending)
+            self.__pending = []
+
+    def Iter_parse(self, cards):
+        """
+        :param cards: iterable of PeopleCardValues or PeopleCardSnapshots
+        :return: generator of PeopleCards, in the order of cards
+        """
+
+        for card in cards:
+            self.__seen.add(card.person_id)
+            root = SnapshotRoot(card.page_source) if isinstance(card, PeopleCardSnapshot) else None
+            fingerprint = CardFingerprint(card, self.XPathsProvider, root)
+            previous = self.Store.Fingerprint(card.person_id)
+            if previous is not None and previous[0] == fingerprint:
+                if previous[1] == self.Parser:
+                    yield self.Store.Get(card.person_id)[1]
+                    continue
+                self.Reparsed += 1
+            elif previous is None:
+                self.Delta.added.append(card.person_id)
+            else:
+                self.Delta.changed.append(card.person_id)
+
+            if root is not None:
+                values = ExtractSnapshotValues(card.page_source, CompiledXPaths.Of(self.XPathsProvider), root)
+                people_card = BuildPeopleCard(card.person_id, values)
+            else:
+                people_card = ParsePeopleCard(card, self.XPathsProvider)
+            self.__pending.append((card.person_id, fingerprint, self.Parser, people_card))
+            if len(self.__pending) >= self.batch_size:
+                self.__flush()
+            yield people_card
+
+        self.__flush()
+
+    def Finish(self, complete: bool = True) -> CardsDelta:
+        """
+        store pending cards, forget people which weren't seen in this run
+        :param complete: bool - crawl saw every person: not debug, no failed pages and no quarantined cards.
+        People missing from partial crawl aren't known to be removed, they are kept and not reported
+        :return: delta of this run against previous one
+        """
+
+        self.__flush()
+        if complete:
+            self.Delta.removed = sorted(self.Store.Person_ids() - self.__seen)
+            self.Store.Delete_many(self.Delta.removed)
+        else:
+            print("[i]delta: crawl is partial, removed people aren't detected")
+        print(f"[i]delta: added={len(self.Delta.added)}, changed={len(self.Delta.changed)}, "
+              f"removed={len(self.Delta.removed)}, parsed again by new parser={self.Reparsed}")
+
+        return self.Delta
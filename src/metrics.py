@@ -0,0 +1,162 @@
+from pathlib import Path
+from collections import defaultdict
+from contextlib import contextmanager
+from threading import Lock
+import threading
+import json
+import time
+import os
+
+
+def __percentile(ordered: list, q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))] if ordered else 0.0
+
+
+def TimingsSummary(durations: list) -> dict:
+    """
+    :param durations: list of seconds
+    :return: count, total and mean, p50, p95, max in milliseconds
+    """
+
+    ordered = sorted(durations)
+    total = sum(ordered)
+    return {
+        "count": len(ordered),
+        "total_s": round(total, 3),
+        "mean_ms": round(total / len(ordered) * 1000, 3) if ordered else 0.0,
+        "p50_ms": round(__percentile(ordered, 0.50) * 1000, 3),
+        "p95_ms": round(__percentile(ordered, 0.95) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3) if ordered else 0.0,
+    }
+
+
+class Metrics:
+    """
+    Timings of crawl: stages (login, page_discovery, link_extraction, card_fetch, parse, export),
+    WebDriver commands by command name and politeness sleeps, which are kept apart from useful time.
+    Exported as JSON summary and Chrome trace timeline (chrome://tracing, ui.perfetto.dev). Thread safe
+    """
+
+    def __init__(self, trace_limit: int = 1_000_000):
+        """
+        Constructor of Metrics
+        :param trace_limit: int - max events kept for trace timeline, summary counts all events anyway
+        """
+
+        self.trace_limit = trace_limit
+        self.Stages = defaultdict(list)
+        self.Commands = defaultdict(list)
+        self.Sleeps = []
+        self.stages_sleep = 0.0
+        self.Counters = defaultdict(int)
+        self.__events = []
+        self.__origin = time.perf_counter()
+        self.__lock = Lock()
+        self.__local = threading.local()
+
+    def __record(self, kind: str, name: str, started: float, duration: float, args: dict = None):
+        event = {"name": name, "cat": kind, "ph": "X", "ts": round((started - self.__origin) * 1e6, 1),
+                 "dur": round(duration * 1e6, 1), "pid": os.getpid(), "tid": threading.get_ident()}
+        if args:
+            event["args"] = args
+        with self.__lock:
+            if kind == "stage":
+                self.Stages[name].append(duration)
+            elif kind == "command":
+                self.Commands[name].append(duration)
+            else:
+                self.Sleeps.append(duration)
+                if getattr(self.__local, "depth", 0) > 0:
+                    self.stages_sleep += duration
+            if len(self.__events) < self.trace_limit:
+                self.__events.append(event)
+
+    @contextmanager
+    def Stage(self, name: str, **args):
+        """
+        time block of code as stage. Stages aren't nested, useful time is sum of them without sleeps
+        :param name: name of stage
+        :param args: details shown in trace event
+        """
+
+        started = time.perf_counter()
+        self.__local.depth = getattr(self.__local, "depth", 0) + 1
+        try:
+            yield
+        finally:
+            self.__local.depth -= 1
+            self.__record("stage", name, started, time.perf_counter() - started, args)
+
+    def Sleep(self, seconds: float):
+        """
+        sleep and account it as idle time
+        """
+
+        started = time.perf_counter()
+        time.sleep(seconds)
+        self.__record("sleep", "sleep", started, time.perf_counter() - started)
+
+    def Count(self, name: str, value: int = 1):
+        with self.__lock:
+            self.Counters[name] += value
+
+    def Instrument_driver(self, driver):
+        """
+        count and time every WebDriver command of selenium driver by command name
+        (get, findElement, findElements, executeScript, getPageSource, ...)
+        """
+
+        execute = driver.execute
+
+        def timed_execute(driver_command, params=None):
+            started = time.perf_counter()
+            try:
+                return execute(driver_command, params)
+            finally:
+                self.__record("command", driver_command, started, time.perf_counter() - started)
+
+        driver.execute = timed_execute
+
+    def Commands_count(self) -> int:
+        with self.__lock:
+            return sum(len(durations) for durations in self.Commands.values())
+
+    def Summary(self) -> dict:
+        """
+        :return: timings of every stage and command, sleep time and useful time of all stages (without sleeps
+        inside them)
+        """
+
+        with self.__lock:
+            stages = {name: TimingsSummary(durations) for name, durations in self.Stages.items()}
+            commands = {name: TimingsSummary(durations) for name, durations in self.Commands.items()}
+            sleep = sum(self.Sleeps)
+            stages_sleep = self.stages_sleep
+            counters = dict(self.Counters)
+
+        cards = stages.get("card_fetch", {}).get("count", 0)
+        commands_count = sum(command["count"] for command in commands.values())
+        return {
+            "elapsed_s": round(time.perf_counter() - self.__origin, 3),
+            "sleep_s": round(sleep, 3),
+            "useful_s": round(max(0.0, sum(stage["total_s"] for stage in stages.values()) - stages_sleep), 3),
+            "commands_count": commands_count,
+            "commands_per_card": round(commands_count / cards, 2) if cards else 0.0,
+            "stages": stages,
+            "commands": commands,
+            "counters": counters,
+        }
+
+    def Write_json(self, path: Path):
+        Path(path).write_text(json.dumps(self.Summary(), indent=2), encoding="utf-8")
+        print(f"[+]Write metrics summary {Path(path).absolute()}")
+
+    def Write_trace(self, path: Path):
+        """
+        write Chrome trace event format timeline
+        """
+
+        with self.__lock:
+            events = list(self.__events)
+        Path(path).write_text(json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}), encoding="utf-8")
+        print(f"[+]Write metrics trace {Path(path).absolute()}, events={len(events)}")
@@ -0,0 +1,217 @@
+from src.parsers import PeopleCard
+
+from contextlib import nullcontext
+from itertools import islice
+from datetime import date
+import re
+
+
+__SPACES = re.compile(r"\s+")
+__NOT_DIGITS = re.compile(r"\D")
+__NAME = re.compile(r"^[^\W\d_]+(?:[ '\-][^\W\d_]+)*$")
+__NAME_PART = re.compile(r"[^ '\-]+")
+__EMAIL = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+MIN_DATE = date(1900, 1, 1)
+
+
+def Text(value: str) -> (str, bool):
+    """
+    :return: value with collapsed and stripped whitespace, always valid
+    """
+
+    return __SPACES.sub(" ", value).strip(), True
+
+
+def Name(value: str) -> (str, bool):
+    """
+    last, first or middle name: whitespace cleanup, every part of double name capitalized
+    :return: name, valid if it consists of letters, spaces, hyphens and apostrophes only
+    """
+
+    value, _ = Text(value)
+    if not value:
+        return value, True
+    value = __NAME_PART.sub(lambda part: part.group(0).capitalize(), value)
+    return value, __NAME.match(value) is not None
+
+
+def Email(value: str) -> (str, bool):
+    value = Text(value)[0].lower()
+    return value, not value or __EMAIL.match(value) is not None
+
+
+def Phone(value: str) -> (str, bool):
+    """
+    canonical russian phone number +7XXXXXXXXXX from any of "8 (999) 123-45-67", "+7 999 1234567", "9991234567"
+    :return: canonical phone, cleaned value if it isn't phone number
+    """
+
+    digits = __NOT_DIGITS.sub("", value)
+    if not digits:
+        return Text(value)[0], not value.strip()
+    if len(digits) == 11 and digits[0] in "78":
+        digits = digits[1:]
+    if len(digits) != 10:
+        return Text(value)[0], False
+    return "+7" + digits, True
+
+
+def SnilsChecksum(digits: str) -> int:
+    """
+    check number of SNILS: sum of first nine digits weighted 9..1, modulo 101, 100 and 101 become 0
+    :param digits: nine digits of SNILS number
+    """
+
+    total = sum(int(digit) * weight for digit, weight in zip(digits, range(9, 0, -1)))
+    return total % 101 % 100
+
+
+def Snils(value: str) -> (str, bool):
+    """
+    :return: SNILS formatted as XXX-XXX-XXX YY, valid if check number matches.
+    Numbers up to 001-001-998 have no check number
+    """
+
+    digits = __NOT_DIGITS.sub("", value)
+    if not digits:
+        return Text(value)[0], not value.strip()
+    if len(digits) != 11:
+        return Text(value)[0], False
+    formatted = f"{digits[:3]}-{digits[3:6]}-{digits[6:9]} {digits[9:]}"
+    return formatted, int(digits[:9]) <= 1001998 or SnilsChecksum(digits[:9]) == int(digits[9:])
+
+
+def Digits(count: int):
+    """
+    :return: normalizer of numbers of count digits, e.g. passport series (4) and number (6)
+    """
+
+    def normalize(value: str) -> (str, bool):
+        digits = __NOT_DIGITS.sub("", value)
+        if not value.strip():
+            return "", True
+        return (digits, True) if len(digits) == count else (Text(value)[0], False)
+
+    return normalize
+
+
+def Upper(value: str) -> (str, bool):
+    value, _ = Text(value)
+    return value.replace(" ", "").upper(), True
+
+
+def PastDate(value: date) -> (date, bool):
+    """
+    :return: date, valid if it's unknown (date.min) or between MIN_DATE and today
+    """
+
+    return value, value == date.min or MIN_DATE <= value <= date.today()
+
+
+def AnyDate(value: date) -> (date, bool):
+    return value, value == date.min or value >= MIN_DATE
+
+
+# (field path, section of card, attribute, normalizer); field paths are the same as in PeopleCard.Missing_fields
+FIELDS = [
+    ("personal_data.last_name", lambda card: card.PersonalData, "last_name", Name),
+    ("personal_data.first_name", lambda card: card.PersonalData, "first_name", Name),
+    ("personal_data.middle_name", lambda card: card.PersonalData, "middle_name", Name),
+    ("personal_data.birth_date", lambda card: card.PersonalData, "birth_date", PastDate),
+    ("personal_data.birth_place", lambda card: card.PersonalData, "birth_place", Text),
+    ("personal_data.notes", lambda card: card.PersonalData, "notes", Text),
+    ("document.snils", lambda card: card.Document, "snils", Snils),
+    ("document.visa", lambda card: card.Document, "visa", Text),
+    ("document.birth_certificate.series", lambda card: card.Document.birth_certificate, "series", Upper),
+    ("document.birth_certificate.number", lambda card: card.Document.birth_certificate, "number", Digits(6)),
+    ("document.birth_certificate.issued_by", lambda card: card.Document.birth_certificate, "issued_by", Text),
+    ("document.birth_certificate.issued_date", lambda card: card.Document.birth_certificate, "issued_date",
+     PastDate),
+    ("document.birth_certificate.issued_place", lambda card: card.Document.birth_certificate, "issued_place",
+     Text),
+    ("document.birth_certificate.act_number", lambda card: card.Document.birth_certificate, "act_number", Text),
+    ("document.passport.series", lambda card: card.Document.passport, "series", Digits(4)),
+    ("document.passport.number", lambda card: card.Document.passport, "number", Digits(6)),
+    ("document.passport.issued_by", lambda card: card.Document.passport, "issued_by", Text),
+    ("document.passport.issued_date", lambda card: card.Document.passport, "issued_date", PastDate),
+    ("document.passport.issued_place", lambda card: card.Document.passport, "issued_place", Text),
+    ("contact_data.permanent_address", lambda card: card.ContactData, "permanent_address", Text),
+    ("contact_data.temporary_address", lambda card: card.ContactData, "temporary_address", Text),
+    ("contact_data.temporary_address_end_date", lambda card: card.ContactData, "temporary_address_end_date",
+     AnyDate),
+    ("contact_data.fact_address", lambda card: card.ContactData, "fact_address", Text),
+    ("contact_data.email", lambda card: card.ContactData, "email", Email),
+    ("contact_data.work_phone", lambda card: card.ContactData, "work_phone", Phone),
+    ("contact_data.mobile_phone", lambda card: card.ContactData, "mobile_phone", Phone),
+    ("contact_data.home_phone", lambda card: card.ContactData, "home_phone", Phone),
+    ("worker_data.work_start_date", lambda card: card.WorkerData, "work_start_date", PastDate),
+    ("worker_data.work_end_date", lambda card: card.WorkerData, "work_end_date", AnyDate),
+    ("worker_data.teacher_start_date", lambda card: card.WorkerData, "teacher_start_date", PastDate),
+]
+
+
+class CardsNormalizer:
+    """
+    Batch normalization and validation stage between ParsePeopleCard and PeopleCardsBuilder.
+    Cards are taken by batches and processed column by column: every distinct value of column is normalized once,
+    repeated values (dates, places, authorities, empty fields) cost one dict lookup. Invalid values are kept
+    cleaned and their field paths are added to Invalid_fields of card, after dates parser couldn't read
+    """
+
+    def __init__(self, batch_size: int = 5000, metrics=None):
+        """
+        Constructor of CardsNormalizer
+        :param batch_size: int - cards normalized at once
+        :param metrics: Metrics - time normalization of every batch
+        """
+
+        self.batch_size = batch_size
+        self.Metrics = metrics
+        self.Invalid_counts = {}
+
+    def Normalize_batch(self, cards: [PeopleCard]) -> [PeopleCard]:
+        """
+        normalize cards in place
+        :param cards: list of PeopleCards, not compacted (CompactPeopleCard is immutable)
+        :return: the same cards
+        """
+
+        invalid = [list(card.Invalid_fields) for card in cards]
+        for fields in invalid:
+            for path in fields:
+                self.Invalid_counts[path] = self.Invalid_counts.get(path, 0) + 1
+        for path, section, attribute, normalize in FIELDS:
+            sections = [section(card) for card in cards]
+            column = [getattr(item, attribute) if item is not None else None for item in sections]
+            normalized = {value: normalize(value) for value in dict.fromkeys(column) if value is not None}
+            for index, (item, value) in enumerate(zip(sections, column)):
+                if value is None:
+                    continue
+                new_value, valid = normalized[value]
+                if new_value != value:
+                    setattr(item, attribute, new_value)
+                if not valid and path not in invalid[index]:
+                    invalid[index].append(path)
+                    self.Invalid_counts[path] = self.Invalid_counts.get(path, 0) + 1
+
+        for card, fields in zip(cards, invalid):
+            card.Invalid_fields = tuple(fields)
+
+        return cards
+
+    def Iter_normalize(self, cards):
+        """
+        normalize cards lazily, batch by batch
+        :param cards: iterable of PeopleCards
+        :return: generator of PeopleCards in the same order
+        """
+
+        cards = iter(cards)
+        for batch in iter(lambda: list(islice(cards, self.batch_size)), []):
+            with self.Metrics.Stage("normalize", cards=len(batch)) if self.Metrics is not None else nullcontext():
+                self.Normalize_batch(batch)
+            yield from batch
+
+        if self.Invalid_counts:
+            print(f"[i]{self.__class__.__name__}: invalid fields {self.Invalid_counts}")
@@ -1,11 +1,13 @@
-from src.core_driver import PeopleCardWebElement
-from src.data_providers import XPathsProvider, WebServices
-from selenium.webdriver.remote.webelement import WebElement
-from selenium.webdriver.common.by import By
-from selenium.common.exceptions import *
+from src.cards import PeopleCardValues, PeopleCardSnapshot
+from src.data_providers import XPathsProvider
 from dataclasses import dataclass
 from enum import Enum
 from datetime import date
+from functools import lru_cache
+
+# version of mapping raw values to PeopleCard, bump on every change of parsed output:
+# cards stored by IncrementalParser with other version are parsed again
+PARSER_VERSION = 3
 
 
 class Gender(Enum):
@@ -20,6 +22,18 @@ class Citizenship(Enum):
     StatelessPerson = "Лицо без гражданства"
     CitizenOfRussianFederationAndForeign = "Гражданин Российской Федерации и иностранного государства"
 
+    @staticmethod
+    def From_text(text) -> "Citizenship":
+        """
+        :param text: text of selected option of 'citizenshipType' select
+        :return: citizenship, Undefined if text is unknown
+        """
+
+        try:
+            return Citizenship(text.strip()) if isinstance(text, str) else Citizenship.Undefined
+        except ValueError:
+            return Citizenship.Undefined
+
 
 @dataclass
 class BirthCertificate:
@@ -86,160 +100,200 @@ class WorkerData:
 
 
 class PeopleCard:
+    Missing_fields = ()  # cards pickled before completeness was tracked
+    Invalid_fields = ()  # cards pickled before validity was tracked
+
     def __init__(self, person_id: int, personal_data: PersonalData, document: Document, contact_data: ContactData,
-                 worker_data: WorkerData = None):
+                 worker_data: WorkerData = None, missing_fields: [str] = None, invalid_fields: [str] = None):
+        """
+        :param missing_fields: paths of fields not found on card page, e.g. "document.passport.series".
+        They hold defaults (empty string, date.min) instead of values
+        :param invalid_fields: paths of fields with values which can't be parsed, e.g. date "31.02.2010".
+        CardsNormalizer adds fields failed its validation
+        """
+
         self.Id = person_id
         self.PersonalData = personal_data
         self.Document = document
         self.ContactData = contact_data
         self.WorkerData = worker_data
+        self.Missing_fields = tuple(missing_fields) if missing_fields is not None else ()
+        self.Invalid_fields = tuple(invalid_fields) if invalid_fields is not None else ()
+
+    def Is_complete(self) -> bool:
+        """
+        :return: bool - every field was found on card page
+        """
+
+        return not self.Missing_fields
+
 
+@lru_cache(maxsize=65536)
+def DateConvert(raw_date: str) -> date:
+    """
+    parse date of card field "dd.mm.yyyy", every distinct string is parsed once
+    :return: date or date.min if raw_date is empty or isn't a date
+    """
 
-def __dateConvert(raw_date: str) -> date:
-    split_date = raw_date.split('.')
-    if len(split_date) == 3:
+    split_date = raw_date.strip().split('.')
+    if len(split_date) != 3:
+        return date.min
+    try:
         return date(int(split_date[2]), int(split_date[1]), int(split_date[0]))
-    else:
+    except ValueError:
         return date.min
 
 
-def __build_personal_data(element: WebElement, xpaths: dict) -> PersonalData:
-    _last_name = ''
-    _first_name = ''
-    _middle_name = ''
-    _gender = Gender.Female
-    _birth_date = date.min
-    _birth_place = ''
-    _citizenship = Citizenship.Undefined
-    _notes = ''
-    try:
-        _last_name = element.find_element(By.XPATH, xpaths["last_name"]).get_attribute("value")
-        _first_name = element.find_element(By.XPATH, xpaths["first_name"]).get_attribute("value")
+def __text_value(values: dict, key: str) -> str:
+    value = values.get(key)
+    return value if isinstance(value, str) else ''
 
-        _middle_name = element.find_element(By.XPATH, xpaths["middle_name"]).get_attribute("value")
-        sexM = element.find_element(By.XPATH, (xpaths["sexM"]))
-        _gender = Gender.Male if sexM.get_attribute("checked") == "checked" else Gender.Female
-        _birth_date = __dateConvert(element.find_element(By.XPATH, xpaths["birth_date"]).get_attribute("value"))
 
-        _birth_place = element.find_element(By.XPATH, xpaths["birth_place"]).get_attribute("value")
+def __date_value(values: dict, key: str) -> date:
+    return DateConvert(__text_value(values, key))
 
-        _citizenship = Citizenship.Undefined  # TODO: add parse citizenship
-        _notes = element.find_element(By.XPATH, xpaths["notes"]).text
 
-    except NoSuchElementException:
-        pass
+def __personal_data_from_values(values: dict) -> PersonalData:
+    return PersonalData(last_name=__text_value(values, "last_name"), first_name=__text_value(values, "first_name"),
+                        middle_name=__text_value(values, "middle_name"),
+                        gender=Gender.Male if values.get("sexM") is True else Gender.Female,
+                        birth_date=__date_value(values, "birth_date"),
+                        birth_place=__text_value(values, "birth_place"),
+                        citizenship=Citizenship.From_text(values.get("citizenship")),
+                        notes=__text_value(values, "notes"))
 
-    return PersonalData(last_name=_last_name, first_name=_first_name, middle_name=_middle_name,
-                        gender=_gender, birth_date=_birth_date, birth_place=_birth_place,
-                        citizenship=_citizenship, notes=_notes)
 
+def __birth_certificate_from_values(values: dict) -> BirthCertificate:
+    return BirthCertificate(series=__text_value(values, "series"), number=__text_value(values, "number"),
+                            issued_by=__text_value(values, "issued_by"),
+                            issued_date=__date_value(values, "issued_date"),
+                            issued_place=__text_value(values, "issued_place"),
+                            act_number=__text_value(values, "act_number"))
 
-def __build_birth_certificate(element: WebElement, xpaths: dict) -> BirthCertificate:
-    _series = ''
-    _number = ''
-    _issued_by = ''
-    _issued_date = date.min
-    _issued_place = ''
-    _act_number = ''
-    try:
-        _series = element.find_element(By.XPATH, xpaths["series"]).get_attribute("value")
-        _number = element.find_element(By.XPATH, xpaths["number"]).get_attribute("value")
-        _issued_by = element.find_element(By.XPATH, xpaths["issued_by"]).get_attribute("value")
-        _issued_date = __dateConvert(element.find_element(By.XPATH, xpaths["issued_date"]).get_attribute("value"))
-        _issued_place = element.find_element(By.XPATH, xpaths["issued_place"]).get_attribute("value")
-        _act_number = element.find_element(By.XPATH, xpaths["act_number"]).get_attribute("value")
-    except NoSuchElementException:
-        pass
-    return BirthCertificate(series=_series, number=_number, issued_by=_issued_by, issued_date=_issued_date,
-                            issued_place=_issued_place, act_number=_act_number)
-
-
-def __build_passport(element: WebElement, xpaths: dict) -> Passport:
-    _series = ''
-    _number = ''
-    _issued_by = ''
-    _issued_date = date.min
-    _issued_place = ''
-    try:
-        _series = element.find_element(By.XPATH, xpaths["series"]).get_attribute("value")
-        _number = element.find_element(By.XPATH, xpaths["number"]).get_attribute("value")
-        _issued_by = element.find_element(By.XPATH, xpaths["issued_by"]).get_attribute("value")
-        _issued_date = __dateConvert(element.find_element(By.XPATH, xpaths["issued_date"]).get_attribute("value"))
-        _issued_place = element.find_element(By.XPATH, xpaths["issued_place"]).get_attribute("value")
-    except NoSuchElementException:
-        pass
-    return Passport(series=_series, number=_number, issued_by=_issued_by,
-                    issued_date=_issued_date, issued_place=_issued_place)
-
-
-def __build_document(element: WebElement, xpaths: dict) -> Document:
-    _snils = ''
-    _visa = ''
-    _birth_certificate = __build_birth_certificate(element, xpaths["birth_certificate_xpaths"])
-    _passport = __build_passport(element, xpaths["passport_xpaths"])
-    try:
-        _snils = element.find_element(By.XPATH, xpaths["snils"]).get_attribute("value")
-        _visa = element.find_element(By.XPATH, xpaths["visa"]).get_attribute("value")
-    except NoSuchElementException:
-        pass
 
-    return Document(snils=_snils, visa=_visa, birth_certificate=_birth_certificate, passport=_passport)
+def __passport_from_values(values: dict) -> Passport:
+    return Passport(series=__text_value(values, "series"), number=__text_value(values, "number"),
+                    issued_by=__text_value(values, "issued_by"), issued_date=__date_value(values, "issued_date"),
+                    issued_place=__text_value(values, "issued_place"))
 
 
-def __build_contact_data(element: WebElement, xpaths: dict) -> ContactData:
-    _permanent_address = ''
-    _temporary_address = ''
-    _temporary_address_end_date = date.min
-    _fact_address = ''
-    _email = ''
-    _work_phone = ''
-    _mobile_phone = ''
-    _home_phone = ''
+def __document_from_values(values: dict) -> Document:
+    return Document(snils=__text_value(values, "snils"), visa=__text_value(values, "visa"),
+                    birth_certificate=__birth_certificate_from_values(values.get("birth_certificate_xpaths", {})),
+                    passport=__passport_from_values(values.get("passport_xpaths", {})))
 
-    try:
-        _permanent_address = element.find_element(By.XPATH, xpaths["permanent_address"]).get_attribute("value")
-        _temporary_address = element.find_element(By.XPATH, xpaths["temporary_address"]).get_attribute("value"),
-        _temporary_address_end_date = __dateConvert(element.find_element(By.XPATH, xpaths["temporary_address_end_date"])
-                                                    .get_attribute("value")),
-        _fact_address = element.find_element(By.XPATH, xpaths["fact_address"]).get_attribute("value"),
-        _email = element.find_element(By.XPATH, xpaths["email"]).get_attribute("value"),
-        _work_phone = element.find_element(By.XPATH, xpaths["work_phone"]).get_attribute("value"),
-        _mobile_phone = element.find_element(By.XPATH, xpaths["mobile_phone"]).get_attribute("value"),
-        _home_phone = element.find_element(By.XPATH, xpaths["home_phone"]).get_attribute("value")
-    except NoSuchElementException:
-        pass
-
-    return ContactData(permanent_address=_permanent_address, temporary_address=_temporary_address,
-                       temporary_address_end_date=_temporary_address_end_date, fact_address=_fact_address,
-                       email=_email, work_phone=_work_phone, mobile_phone=_mobile_phone, home_phone=_home_phone)
-
-
-def __build_worker_data(element: WebElement, xpaths: dict) -> WorkerData:
-    _work_start_date = date.min
-    _work_end_date = date.min
-    _teacher_start_date = date.min
 
-    try:
-        _work_start_date = __dateConvert(element.find_element(By.XPATH, xpaths["work_start_date"])
-                                         .get_attribute("value"))
-        _work_end_date = __dateConvert(element.find_element(By.XPATH, xpaths["work_end_date"]).get_attribute("value"))
-        _teacher_start_date = __dateConvert(element.find_element(By.XPATH, xpaths["teacher_start_date"])
-                                            .get_attribute("value"))
-    except NoSuchElementException:
-        pass
+def __contact_data_from_values(values: dict) -> ContactData:
+    return ContactData(permanent_address=__text_value(values, "permanent_address"),
+                       temporary_address=__text_value(values, "temporary_address"),
+                       temporary_address_end_date=__date_value(values, "temporary_address_end_date"),
+                       fact_address=__text_value(values, "fact_address"), email=__text_value(values, "email"),
+                       work_phone=__text_value(values, "work_phone"),
+                       mobile_phone=__text_value(values, "mobile_phone"),
+                       home_phone=__text_value(values, "home_phone"))
+
+
+def __worker_data_from_values(values: dict) -> WorkerData:
+    return WorkerData(work_start_date=__date_value(values, "work_start_date"),
+                      work_end_date=__date_value(values, "work_end_date"),
+                      teacher_start_date=__date_value(values, "teacher_start_date"))
+
+
+def MissingFields(values: dict, prefix: str = '') -> [str]:
+    """
+    paths of fields not found on card page: None leaves of raw values tree
+    :param values: raw values tree
+    :return: paths like "document.passport.series"
+    """
+
+    missing = []
+    for key, value in values.items():
+        name = prefix + key.removesuffix("_xpaths")
+        if isinstance(value, dict):
+            missing += MissingFields(value, name + ".")
+        elif value is None:
+            missing.append(name)
+
+    return missing
+
+
+def Is_invalid_date(raw_date: str) -> bool:
+    """
+    :return: bool - raw_date isn't empty but isn't a date, DateConvert turns it to date.min as an empty one
+    """
+
+    return DateConvert(raw_date) == date.min and raw_date.strip() != ''
+
+
+def InvalidDates(values: dict, prefix: str = '') -> [str]:
+    """
+    paths of date fields whose raw values aren't dates, e.g. "31.02.2010" or "2010"
+    :param values: raw values tree
+    :return: paths like "personal_data.birth_date"
+    """
+
+    invalid = []
+    for key, value in values.items():
+        name = prefix + key.removesuffix("_xpaths")
+        if isinstance(value, dict):
+            invalid += InvalidDates(value, name + ".")
+        elif key.endswith("_date") and isinstance(value, str) and Is_invalid_date(value):
+            invalid.append(name)
+
+    return invalid
+
 
-    return WorkerData(work_start_date=_work_start_date, work_end_date=_work_end_date,
-                      teacher_start_date=_teacher_start_date)
+def BuildPeopleCard(person_id: int, values: dict) -> PeopleCard:
+    """
+    map raw values tree (shape of *_xpaths from XPaths.json) to PeopleCard
+    :param person_id: id of person
+    :param values: raw values tree
+    :return: people card
+    """
 
+    pdata = __personal_data_from_values(values.get("personal_data_xpaths", {}))
+    doc = __document_from_values(values.get("document_xpaths", {}))
+    cdata = __contact_data_from_values(values.get("contact_data_xpaths", {}))
+    wdata = __worker_data_from_values(values.get("worker_data_xpaths", {}))
+
+    return PeopleCard(person_id=person_id, personal_data=pdata, document=doc, contact_data=cdata, worker_data=wdata,
+                      missing_fields=MissingFields(values), invalid_fields=InvalidDates(values))
 
-def ParsePeopleCard(card: PeopleCardWebElement, xpaths_provider: XPathsProvider) -> PeopleCard:
-    dnevnik_xpaths = xpaths_provider.get(WebServices.Dnevnik)
 
-    pdata = __build_personal_data(card.personal_data, dnevnik_xpaths["personal_data_xpaths"])
-    doc = __build_document(card.document, dnevnik_xpaths["document_xpaths"])
-    cdata = __build_contact_data(card.contact_data, dnevnik_xpaths["contact_data_xpaths"])
-    wdata = __build_worker_data(card.worker_data, dnevnik_xpaths["worker_data_xpaths"])
+def ParsePeopleCard(card, xpaths_provider: XPathsProvider) -> PeopleCard:
+    """
+    parse people card collected by CoreDriver
+    :param card: PeopleCardWebElement, PeopleCardValues or PeopleCardSnapshot
+    :param xpaths_provider: provider of XPaths.json
+    :return: people card
+    """
 
-    people_card = PeopleCard(person_id=card.person_id, personal_data=pdata, document=doc, contact_data=cdata, worker_data=wdata)
+    if isinstance(card, PeopleCardValues):
+        return BuildPeopleCard(card.person_id, card.values)
+    if isinstance(card, PeopleCardSnapshot):
+        from src.snapshot_parser import CompiledXPaths, ExtractSnapshotValues  # lxml is loaded by first snapshot
+
+        values = ExtractSnapshotValues(card.page_source, CompiledXPaths.Of(xpaths_provider))
+        return BuildPeopleCard(card.person_id, values)
 
-    return people_card
+    from src.element_parser import ParsePeopleCardElements  # selenium is loaded by first web elements card
+
+    return ParsePeopleCardElements(card, xpaths_provider)
+
+
+def IterParsePeopleCards(cards, xpaths_provider: XPathsProvider, metrics=None):
+    """
+    parse people cards lazily, one by one
+    :param cards: iterable of cards collected by CoreDriver or HttpSession
+    :param xpaths_provider: provider of XPaths.json
+    :param metrics: Metrics - time parse of every card
+    :return: generator of PeopleCards
+    """
+
+    for card in cards:
+        if metrics is None:
+            yield ParsePeopleCard(card, xpaths_provider)
+            continue
+        with metrics.Stage("parse"):
+            people_card = ParsePeopleCard(card, xpaths_provider)
+        yield people_card
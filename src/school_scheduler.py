@@ -0,0 +1,197 @@
+from src.http_session import HttpSession
+from src.parsers import ParsePeopleCard
+from src.data_builders import PeopleCardsBuilder
+from src.throttle import AimdThrottle
+
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from pathlib import Path
+import multiprocessing
+import requests
+import os
+
+
+# state of worker process, set by InitWorker
+__session = None
+
+
+def InitWorker(cookies: [dict], user_agent: str, limit, timeout: float, rate: float):
+    """
+    initializer of worker process: its own HttpSession, requests capped by limit shared by all workers.
+    Its AimdThrottle paces requests of the process up to rate and retries overloaded ones
+    :param rate: float - max requests per second of the process, its share of rate of all workers
+    """
+
+    global __session
+    throttle = AimdThrottle(rate=rate, min_rate=min(0.1, rate), max_rate=rate)
+    __session = HttpSession(cookies, user_agent, pool_size=2, timeout=timeout, limit=limit, throttle=throttle)
+
+
+def __session_of(school: int) -> HttpSession:
+    __session.UrlsProvider = __session.UrlsProvider.With_school(school)
+    return __session
+
+
+def DiscoverUnit(school: int) -> int:
+    """
+    work unit of worker process
+    :return: count of 'current peoples pages' of school
+    """
+
+    return __session_of(school).Get_max_current_peoples_pages()
+
+
+def PageUnit(school: int, page: int) -> (list, list):
+    """
+    work unit of worker process: fetch and parse all people cards of one page of school.
+    Failed card doesn't fail the unit, its link is returned for quarantine; failed list page fails the unit
+    :return: (list of PeopleCards in page order, list of links of failed cards)
+    """
+
+    session = __session_of(school)
+    cards = []
+    failed = []
+    for link in session.Get_current_peoples_links(page):
+        try:
+            cards.append(ParsePeopleCard(session.Get_people_card(link), session.XPathsProvider))
+        except requests.RequestException as ex:
+            print(f"[x]school {school} page {page}: people card {link} is quarantined: {ex}")
+            failed.append(link)
+
+    return cards, failed
+
+
+class SchoolScheduler:
+    """
+    The class crawls many schools by (school, page) work units on pool of worker processes. Every worker has
+    its own HttpSession with cookies of logged in session, requests in flight of all workers are capped
+    by one semaphore and requests per second by equal shares of rate. Overloaded requests are retried by
+    throttle of worker, failed units are submitted again up to unit_attempts times. Failed cards don't fail
+    their page, they are listed in Quarantine. Cards of every school are written to its own directory as soon as all its pages are done
+    """
+
+    DefaultOutDir = Path("./out/schools")
+
+    def __init__(self, schools: [int], cookies: [dict], user_agent: str = None, workers: int = None,
+                 max_concurrency: int = 8, rate: float = 8, timeout: float = 30, unit_attempts: int = 3,
+                 out_dir: Path = DefaultOutDir):
+        """
+        Constructor of SchoolScheduler
+        :param schools: ids of schools
+        :param cookies: selenium-like cookie dicts of logged in session
+        :param user_agent: user agent of browser the cookies were issued to
+        :param workers: int - worker processes, count of cpus if None
+        :param max_concurrency: int - max requests in flight of all workers together
+        :param rate: float - max requests per second of all workers together
+        :param timeout: float - timeout of every request in seconds
+        :param unit_attempts: int - attempts of every work unit
+        :param out_dir: directory of per-school directories
+        """
+
+        self.schools = list(schools)
+        self.cookies = cookies
+        self.user_agent = user_agent
+        self.workers = workers if workers is not None else os.cpu_count()
+        self.max_concurrency = max_concurrency
+        self.rate = rate
+        self.timeout = timeout
+        self.unit_attempts = unit_attempts
+        self.out_dir = Path(out_dir)
+        self.Failed_units = []
+        self.Quarantine = []
+
+    def __write_school(self, school: int, pages: dict) -> int:
+        """
+        write cards of school in page order, people seen on previous pages are skipped
+        :param pages: page -> list of PeopleCards
+        :return: count of written cards
+        """
+
+        seen = set()
+        cards = []
+        for page in sorted(pages):
+            for card in pages[page]:
+                if card.Id not in seen:
+                    seen.add(card.Id)
+                    cards.append(card)
+
+        out_dir = self.out_dir / f"school_{school}"
+        out_dir.mkdir(parents=True, exist_ok=True)
+        print(f"[+]school {school}: {len(cards)} cards")
+        return PeopleCardsBuilder(cards).Build(out_name=f"school_{school}", out_dir=out_dir)
+
+    def __run_units(self, pool: ProcessPoolExecutor, units: list, on_done):
+        """
+        run work units on pool, failed unit is submitted again until it has no attempts left
+        :param units: list of (unit function, args)
+        :param on_done: function(args, result) called for every unit, result is None if unit failed all attempts
+        """
+
+        pending = {pool.submit(function, *args): (function, args, 1) for function, args in units}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                function, args, attempt = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as ex:
+                    print(f"[x]{self.__class__.__name__}: {function.__name__}{args} attempt {attempt} failed: {ex}")
+                    if attempt < self.unit_attempts:
+                        pending[pool.submit(function, *args)] = (function, args, attempt + 1)
+                        continue
+                    result = None
+                on_done(args, result)
+
+    def Run(self, debug: bool = False) -> dict:
+        """
+        crawl all schools
+        :param debug: bool - only first page of every school
+        :return: school -> count of written cards
+        """
+
+        self.Failed_units = []
+        self.Quarantine = []
+        limit = multiprocessing.get_context().BoundedSemaphore(self.max_concurrency)
+        written = {}
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=InitWorker,
+                                 initargs=(self.cookies, self.user_agent, limit, self.timeout,
+                                           self.rate / self.workers)) as pool:
+            max_pages = {school: 1 for school in self.schools} if debug else {}
+
+            def discovered(args: tuple, pages):
+                school, = args
+                if pages is None:
+                    self.Failed_units.append((school, None))
+                else:
+                    max_pages[school] = pages
+
+            if not debug:
+                self.__run_units(pool, [(DiscoverUnit, (school,)) for school in self.schools], discovered)
+
+            units = [(PageUnit, (school, page)) for school in max_pages for page in range(1, max_pages[school] + 1)]
+            print(f"[i]{self.__class__.__name__}: {len(max_pages)} schools, {len(units)} pages, "
+                  f"{self.workers} workers, max {self.max_concurrency} requests in flight, {self.rate} req/s")
+
+            results = {school: {} for school in max_pages}
+            quarantined = {}
+
+            def page_done(args: tuple, result):
+                school, page = args
+                cards, failed = result if result is not None else ([], [])
+                if result is None:
+                    self.Failed_units.append((school, page))
+                self.Quarantine += failed
+                quarantined[school] = quarantined.get(school, 0) + len(failed)
+                results[school][page] = cards
+                if len(results[school]) == max_pages[school]:
+                    failed_pages = [unit_page for unit_school, unit_page in self.Failed_units if unit_school == school]
+                    if failed_pages or quarantined[school]:
+                        print(f"[x]{self.__class__.__name__}: school {school} is incomplete: "
+                              f"failed pages {sorted(failed_pages)}, quarantined cards {quarantined[school]}")
+                    written[school] = self.__write_school(school, results.pop(school))
+
+            self.__run_units(pool, units, page_done)
+
+        if self.Failed_units or self.Quarantine:
+            print(f"[x]{self.__class__.__name__}: failed units {sorted(self.Failed_units, key=str)}, "
+                  f"quarantined cards {len(self.Quarantine)}")
+        return written
@@ -0,0 +1,52 @@
+from pathlib import Path
+from datetime import datetime
+import json
+import os
+
+
+class SessionStore:
+    """
+    Cookie jar of logged in session in JSON file, reused by later runs instead of full Login.
+    The file holds credentials of the session, it's readable only by its owner
+    """
+
+    DefaultPath = Path("./out/session.json")
+
+    def __init__(self, path: Path = DefaultPath):
+        self.path = Path(path)
+        self.user_agent = None
+
+    def Load(self):
+        """
+        :return: selenium-like cookie dicts of saved session or None if nothing is saved
+        """
+
+        if not self.path.exists():
+            return None
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except ValueError as ex:
+            print(f"[x]{self.__class__.__name__}: {self.path} is broken: {ex}")
+            return None
+
+        self.user_agent = data.get("user_agent")
+        print(f"[i]{self.__class__.__name__}: loaded {len(data['cookies'])} cookies saved at {data['saved_at']}")
+        return data["cookies"]
+
+    def Save(self, cookies: [dict], user_agent: str = None):
+        """
+        :param cookies: selenium-like or DevTools cookie dicts
+        :param user_agent: user agent of browser the cookies were issued to
+        """
+
+        self.user_agent = user_agent
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {"saved_at": datetime.now().isoformat(timespec="seconds"), "user_agent": user_agent,
+                "cookies": cookies}
+        descriptor = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(descriptor, "w", encoding="utf-8") as file:
+            json.dump(data, file, ensure_ascii=False)
+        print(f"[+]{self.__class__.__name__}: saved {len(cookies)} cookies to {self.path.absolute()}")
+
+    def Clear(self):
+        self.path.unlink(missing_ok=True)
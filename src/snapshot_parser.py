@@ -0,0 +1,155 @@
+from src.data_providers import XPathsProvider, WebServices, CARD_SECTIONS, CARD_VALUES_SECTIONS
+from lxml import etree, html
+import hashlib
+from weakref import WeakKeyDictionary
+from urllib.parse import urljoin
+
+
+class CompiledXPaths:
+    """
+    XPaths.json people card tree compiled to lxml XPath objects. Compile once, evaluate on every snapshot
+    """
+
+    __cache = WeakKeyDictionary()
+
+    def __init__(self, xpaths_provider: XPathsProvider):
+        dnevnik_xpaths = xpaths_provider.get(WebServices.Dnevnik)
+        self.tree = {section: self.__compile(dnevnik_xpaths[section]) for section in CARD_VALUES_SECTIONS}
+        section_xpaths = dict.fromkeys(dnevnik_xpaths[section] for section in CARD_SECTIONS)
+        self.sections = [etree.XPath(xpath) for xpath in section_xpaths]
+
+    @staticmethod
+    def __compile(xpaths: dict) -> dict:
+        compiled = {}
+        for key, obj in xpaths.items():
+            if type(obj) is str:
+                compiled[key] = etree.XPath(obj)
+            if type(obj) is dict:
+                compiled[key] = CompiledXPaths.__compile(obj)
+
+        return compiled
+
+    @staticmethod
+    def Of(xpaths_provider: XPathsProvider) -> "CompiledXPaths":
+        """
+        get compiled xpaths of provider, compile only on first call
+        :param xpaths_provider: provider of XPaths.json
+        :return: compiled xpaths
+        """
+
+        compiled = CompiledXPaths.__cache.get(xpaths_provider)
+        if compiled is None:
+            compiled = CompiledXPaths(xpaths_provider)
+            CompiledXPaths.__cache[xpaths_provider] = compiled
+
+        return compiled
+
+
+def __read(result):
+    """
+    read value of first found node the same way as EXTRACT_VALUES_SCRIPT does in the browser
+    """
+
+    if not result:
+        return None
+    node = result[0]
+    if not isinstance(node, etree._Element):
+        return str(node)
+
+    tag = str(node.tag).lower()
+    if tag == "input" and node.get("type", "").lower() in ("checkbox", "radio"):
+        return node.get("checked") is not None
+    if tag == "input":
+        return node.get("value", "")
+    if tag == "select":
+        options = node.xpath(".//option[@selected]") or node.xpath(".//option")
+        return options[0].text_content().strip() if options else ""
+
+    return node.text_content().strip()
+
+
+def __walk(root, tree: dict) -> dict:
+    values = {}
+    for key, obj in tree.items():
+        if isinstance(obj, dict):
+            values[key] = __walk(root, obj)
+        else:
+            values[key] = __read(obj(root))
+
+    return values
+
+
+def SnapshotRoot(page_source: str):
+    """
+    :return: parsed html of snapshot, pass it to fingerprint and values extraction to parse page once
+    """
+
+    return html.document_fromstring(page_source)
+
+
+def ExtractSnapshotValues(page_source: str, compiled: CompiledXPaths, root=None) -> dict:
+    """
+    evaluate compiled people card xpaths on html snapshot of card page
+    :param page_source: html of people card page
+    :param compiled: compiled xpaths
+    :param root: SnapshotRoot of page_source, page is parsed if None
+    :return: raw values tree, same shape as PeopleCardValues.values
+    """
+
+    if root is None:
+        root = SnapshotRoot(page_source)
+    return __walk(root, compiled.tree)
+
+
+def SnapshotFingerprint(page_source: str, compiled: CompiledXPaths, root=None) -> str:
+    """
+    fingerprint of people card content: hash of people card sections only, rest of page is ignored.
+    Whole page is hashed if no section is found
+    :param page_source: html of people card page
+    :param compiled: compiled xpaths
+    :param root: SnapshotRoot of page_source, page is parsed if None
+    :return: hex digest
+    """
+
+    if root is None:
+        root = SnapshotRoot(page_source)
+    nodes = [node for section in compiled.sections for node in section(root)]
+    if not nodes:
+        nodes = [root]
+
+    digest = hashlib.sha1()
+    for node in nodes:
+        digest.update(etree.tostring(node, method="c14n"))
+
+    return digest.hexdigest()
+
+
+def ExtractMaxPages(page_source: str, xpath: str) -> int:
+    """
+    read count of 'Current Peoples' pages from html of 'Current Peoples' page
+    :param page_source: html of page
+    :param xpath: max_current_peoples xpath
+    :return: pages count
+    """
+
+    root = html.document_fromstring(page_source)
+    return int(root.xpath(xpath)[0].text_content().strip())
+
+
+def ExtractPeopleLinks(page_source: str, table_xpath: str, base_url: str) -> [str]:
+    """
+    read people card links from last cell of every row of 'Current Peoples' table
+    :param page_source: html of page
+    :param table_xpath: current_peoples_table xpath
+    :param base_url: url of page, used to resolve relative links
+    :return: absolute links
+    """
+
+    root = html.document_fromstring(page_source)
+    links = []
+    for table in root.xpath(table_xpath)[:1]:
+        for ceil in table.xpath(".//tr/td[last()]"):
+            for href in ceil.xpath("(.//a)[1]/@href"):
+                links.append(urljoin(base_url, str(href)))
+
+    return links
@@ -0,0 +1,236 @@
+from src.parsers import PeopleCard, PersonalData, Document, BirthCertificate, Passport, ContactData, WorkerData, \
+    Gender, Citizenship
+
+from pathlib import Path
+from datetime import date, datetime
+import sqlite3
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (run_id INTEGER PRIMARY KEY AUTOINCREMENT, started_at TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS people (
+    person_id INTEGER PRIMARY KEY, last_name TEXT, first_name TEXT, middle_name TEXT, gender TEXT,
+    birth_date TEXT, birth_place TEXT, citizenship TEXT, notes TEXT, missing_fields TEXT,
+    invalid_fields TEXT, run_id INTEGER REFERENCES runs);
+CREATE TABLE IF NOT EXISTS documents (
+    person_id INTEGER PRIMARY KEY REFERENCES people, snils TEXT, visa TEXT, run_id INTEGER REFERENCES runs);
+CREATE TABLE IF NOT EXISTS birth_certificates (
+    person_id INTEGER PRIMARY KEY REFERENCES people, series TEXT, number TEXT, issued_by TEXT, issued_date TEXT,
+    issued_place TEXT, act_number TEXT, run_id INTEGER REFERENCES runs);
+CREATE TABLE IF NOT EXISTS passports (
+    person_id INTEGER PRIMARY KEY REFERENCES people, series TEXT, number TEXT, issued_by TEXT, issued_date TEXT,
+    issued_place TEXT, run_id INTEGER REFERENCES runs);
+CREATE TABLE IF NOT EXISTS contacts (
+    person_id INTEGER PRIMARY KEY REFERENCES people, permanent_address TEXT, temporary_address TEXT,
+    temporary_address_end_date TEXT, fact_address TEXT, email TEXT, work_phone TEXT, mobile_phone TEXT,
+    home_phone TEXT, run_id INTEGER REFERENCES runs);
+CREATE TABLE IF NOT EXISTS workers (
+    person_id INTEGER PRIMARY KEY REFERENCES people, work_start_date TEXT, work_end_date TEXT,
+    teacher_start_date TEXT, run_id INTEGER REFERENCES runs);
+CREATE INDEX IF NOT EXISTS documents_snils ON documents (snils) WHERE snils <> '';
+CREATE INDEX IF NOT EXISTS passports_number ON passports (series, number) WHERE number <> '';
+CREATE INDEX IF NOT EXISTS people_name ON people (last_name, first_name, middle_name);
+"""
+
+TABLE_COLUMNS = {
+    "people": ["last_name", "first_name", "middle_name", "gender", "birth_date", "birth_place", "citizenship",
+               "notes", "missing_fields", "invalid_fields"],
+    "documents": ["snils", "visa"],
+    "birth_certificates": ["series", "number", "issued_by", "issued_date", "issued_place", "act_number"],
+    "passports": ["series", "number", "issued_by", "issued_date", "issued_place"],
+    "contacts": ["permanent_address", "temporary_address", "temporary_address_end_date", "fact_address", "email",
+                 "work_phone", "mobile_phone", "home_phone"],
+    "workers": ["work_start_date", "work_end_date", "teacher_start_date"],
+}
+
+
+def __upsert_sql(table: str, columns: list) -> str:
+    all_columns = ["person_id"] + columns + ["run_id"]
+    updates = ", ".join(f"{column} = excluded.{column}" for column in columns + ["run_id"])
+    return f"INSERT INTO {table} ({', '.join(all_columns)}) VALUES ({', '.join('?' * len(all_columns))}) " \
+           f"ON CONFLICT (person_id) DO UPDATE SET {updates}"
+
+
+UPSERT_SQL = {table: __upsert_sql(table, columns) for table, columns in TABLE_COLUMNS.items()}
+
+
+def __history_sql(table: str, columns: list) -> str:
+    """
+    history table of previous versions of rows: when upsert changes any column, the old row is kept
+    with run_id of the last run it was written by. Unchanged rows cost nothing
+    """
+
+    changed = " OR ".join(f"OLD.{column} IS NOT NEW.{column}" for column in columns)
+    all_columns = ["person_id"] + columns + ["run_id"]
+    return f"""
+CREATE TABLE IF NOT EXISTS {table}_history (
+    person_id INTEGER NOT NULL, {', '.join(f'{column} TEXT' for column in columns)}, run_id INTEGER NOT NULL,
+    PRIMARY KEY (person_id, run_id));
+CREATE TRIGGER IF NOT EXISTS {table}_history AFTER UPDATE ON {table} WHEN {changed}
+BEGIN
+    INSERT OR REPLACE INTO {table}_history ({', '.join(all_columns)})
+    VALUES ({', '.join(f'OLD.{column}' for column in all_columns)});
+END;
+"""
+
+
+HISTORY_SCHEMA = "".join(__history_sql(table, columns) for table, columns in TABLE_COLUMNS.items())
+
+
+def __date_text(value: date):
+    return None if value is None or value == date.min else value.isoformat()
+
+
+def CardRows(card: PeopleCard) -> dict:
+    """
+    :return: row of every table for card, without person_id and run_id
+    """
+
+    pd = card.PersonalData
+    doc = card.Document
+    bcert = doc.birth_certificate
+    pas = doc.passport
+    cd = card.ContactData
+    wd = card.WorkerData
+    return {
+        "people": [pd.last_name, pd.first_name, pd.middle_name, pd.gender.name, __date_text(pd.birth_date),
+                   pd.birth_place, pd.citizenship.name, pd.notes, " ".join(card.Missing_fields),
+                   " ".join(card.Invalid_fields)],
+        "documents": [doc.snils, doc.visa],
+        "birth_certificates": [bcert.series, bcert.number, bcert.issued_by, __date_text(bcert.issued_date),
+                               bcert.issued_place, bcert.act_number],
+        "passports": [pas.series, pas.number, pas.issued_by, __date_text(pas.issued_date), pas.issued_place],
+        "contacts": [cd.permanent_address, cd.temporary_address, __date_text(cd.temporary_address_end_date),
+                     cd.fact_address, cd.email, cd.work_phone, cd.mobile_phone, cd.home_phone],
+        "workers": [__date_text(wd.work_start_date), __date_text(wd.work_end_date),
+                    __date_text(wd.teacher_start_date)],
+    }
+
+
+class SqliteCardStore:
+    """
+    Indexed SQLite database of people cards. Cards are upserted by person_id in large batched transactions,
+    tables hold the latest state. Every changed row is kept in <table>_history keyed by (person_id, run_id),
+    run_id of a row is the last run which wrote it
+    """
+
+    DefaultPath = Path("./out/people.sqlite3")
+
+    def __init__(self, path: Path = DefaultPath):
+        self.path = path
+        self.Connection = sqlite3.connect(str(Path(path).absolute()))
+        self.Connection.execute("PRAGMA journal_mode=WAL")
+        self.Connection.execute("PRAGMA synchronous=NORMAL")
+        with self.Connection:
+            self.Connection.executescript(SCHEMA)
+            columns = [row[1] for row in self.Connection.execute("PRAGMA table_info(people)")]
+            for column in ("missing_fields", "invalid_fields"):  # database of version without them
+                if column not in columns:
+                    self.Connection.execute(f"ALTER TABLE people ADD COLUMN {column} TEXT")
+            self.Connection.executescript(HISTORY_SCHEMA)
+
+    def close(self):
+        self.Connection.close()
+
+    @staticmethod
+    def __text_date(value: str) -> date:
+        return date.min if value is None else date.fromisoformat(value)
+
+    def __write_batch(self, batch: list, run_id: int):
+        rows = {table: [] for table in TABLE_COLUMNS}
+        for card in batch:
+            for table, row in CardRows(card).items():
+                rows[table].append([card.Id] + row + [run_id])
+        with self.Connection:
+            for table in TABLE_COLUMNS:
+                self.Connection.executemany(UPSERT_SQL[table], rows[table])
+
+    def Write(self, cards, batch_size: int = 5000) -> int:
+        """
+        upsert cards as a new run
+        :param cards: iterable of PeopleCards
+        :param batch_size: int - cards per transaction
+        :return: count of written cards
+        """
+
+        with self.Connection:
+            run_id = self.Connection.execute("INSERT INTO runs (started_at) VALUES (?)",
+                                             (datetime.now().isoformat(timespec="seconds"),)).lastrowid
+        count = 0
+        batch = []
+        for card in cards:
+            batch.append(card)
+            if len(batch) >= batch_size:
+                self.__write_batch(batch, run_id)
+                count += len(batch)
+                batch = []
+        self.__write_batch(batch, run_id)
+        count += len(batch)
+
+        print(f"[+]Write {count} cards to {Path(self.path).absolute()}, run {run_id}")
+        return count
+
+    def __row(self, table: str, person_id: int, run_id: int = None):
+        """
+        :return: latest row or row as it was written by run_id: the first version written at or after run_id
+        """
+
+        columns = ", ".join(TABLE_COLUMNS[table])
+        if run_id is None:
+            return self.Connection.execute(f"SELECT {columns} FROM {table} WHERE person_id = ?",
+                                           (person_id,)).fetchone()
+        return self.Connection.execute(
+            f"SELECT {columns} FROM (SELECT {columns}, run_id FROM {table} WHERE person_id = ? UNION ALL "
+            f"SELECT {columns}, run_id FROM {table}_history WHERE person_id = ?) "
+            f"WHERE run_id >= ? ORDER BY run_id LIMIT 1", (person_id, person_id, run_id)).fetchone()
+
+    def Get(self, person_id: int, run_id: int = None):
+        """
+        :param run_id: int - card as it was in this run, latest if None
+        :return: PeopleCard of person or None
+        """
+
+        people = self.__row("people", person_id, run_id)
+        if people is None:
+            return None
+        documents = self.__row("documents", person_id, run_id)
+        bcert = self.__row("birth_certificates", person_id, run_id)
+        pas = self.__row("passports", person_id, run_id)
+        cd = self.__row("contacts", person_id, run_id)
+        wd = self.__row("workers", person_id, run_id)
+
+        pdata = PersonalData(last_name=people[0], first_name=people[1], middle_name=people[2],
+                             gender=Gender[people[3]], birth_date=self.__text_date(people[4]), birth_place=people[5],
+                             citizenship=Citizenship[people[6]], notes=people[7])
+        doc = Document(snils=documents[0], visa=documents[1],
+                       birth_certificate=BirthCertificate(bcert[0], bcert[1], bcert[2], self.__text_date(bcert[3]),
+                                                          bcert[4], bcert[5]),
+                       passport=Passport(pas[0], pas[1], pas[2], self.__text_date(pas[3]), pas[4]))
+        cdata = ContactData(cd[0], cd[1], self.__text_date(cd[2]), cd[3], cd[4], cd[5], cd[6], cd[7])
+        wdata = WorkerData(self.__text_date(wd[0]), self.__text_date(wd[1]), self.__text_date(wd[2]))
+
+        card = PeopleCard(person_id=person_id, personal_data=pdata, document=doc, contact_data=cdata,
+                          worker_data=wdata, missing_fields=people[8].split() if people[8] else None)
+        card.Invalid_fields = tuple(people[9].split()) if people[9] else ()
+        return card
+
+    def History(self, person_id: int) -> [tuple]:
+        """
+        :return: list of (run_id, PeopleCard) of every version of card, the latest is the last
+        """
+
+        runs = set()
+        for table in TABLE_COLUMNS:
+            runs.update(run_id for run_id, in self.Connection.execute(
+                f"SELECT run_id FROM {table}_history WHERE person_id = ? UNION "
+                f"SELECT run_id FROM {table} WHERE person_id = ?", (person_id, person_id)))
+
+        return [(run_id, self.Get(person_id, run_id)) for run_id in sorted(runs)]
+
+    def Find_by_snils(self, snils: str) -> [int]:
+        return [person_id for person_id, in self.Connection.execute(
+            "SELECT person_id FROM documents WHERE snils = ? AND snils <> ''", (snils,))]
+
+    def Find_by_passport(self, series: str, number: str) -> [int]:
+        return [person_id for person_id, in self.Connection.execute(
+            "SELECT person_id FROM passports WHERE series = ? AND number = ? AND number <> ''", (series, number))]
@@ -0,0 +1,80 @@
+from threading import Lock
+import time
+
+
+class AimdThrottle:
+    """
+    Adaptive request rate (additive increase, multiplicative decrease). Rate grows by increase after every fast
+    successful response and is cut by decrease factor after slow response or overload (HTTP 429/5xx, timeout,
+    missing element). Shared by all fetches of crawl, thread safe
+    """
+
+    def __init__(self, rate: float = 1, min_rate: float = 0.1, max_rate: float = 20, increase: float = 0.1,
+                 decrease: float = 0.5, slow_latency: float = 5, cooldown: float = 2, retries: int = 3):
+        """
+        Constructor of AimdThrottle
+        :param rate: float - start requests per second
+        :param min_rate: float - rate isn't cut below it
+        :param max_rate: float - rate isn't raised above it
+        :param increase: float - requests per second added after fast successful response
+        :param decrease: float - rate factor after slow response or overload
+        :param slow_latency: float - response slower than it in seconds is overload
+        :param cooldown: float - min seconds between two decreases, failures of requests in flight cut rate once
+        :param retries: int - overloaded request is retried by fetchers at slowed rate up to retries times
+        """
+
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.slow_latency = slow_latency
+        self.cooldown = cooldown
+        self.retries = retries
+        self.__next = time.monotonic()
+        self.__last_decrease = float("-inf")
+        self.__lock = Lock()
+
+    @staticmethod
+    def Is_overload(ex: Exception) -> bool:
+        """
+        :return: bool - exception means server is overloaded, not that request is wrong
+        """
+
+        response = getattr(ex, "response", None)
+        status = getattr(response, "status_code", None) if response is not None else getattr(ex, "status", None)
+        if isinstance(status, int):
+            return status == 429 or status >= 500
+        return True
+
+    def Reserve(self) -> float:
+        """
+        take slot of next request
+        :return: float - seconds to wait before request
+        """
+
+        with self.__lock:
+            now = time.monotonic()
+            start = max(now, self.__next)
+            self.__next = start + 1 / self.rate
+            return start - now
+
+    def Observe(self, latency: float, overload: bool = False):
+        """
+        adapt rate to finished request
+        :param latency: float - seconds of request
+        :param overload: bool - request failed because server is overloaded
+        """
+
+        with self.__lock:
+            if overload or latency > self.slow_latency:
+                now = time.monotonic()
+                if now - self.__last_decrease >= self.cooldown:
+                    self.__last_decrease = now
+                    self.rate = max(self.min_rate, self.rate * self.decrease)
+                    print(f"[i]{self.__class__.__name__}: slow down to {self.rate:.2f} req/s")
+            else:
+                self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def Observe_error(self, latency: float, ex: Exception):
+        self.Observe(latency, overload=self.Is_overload(ex))